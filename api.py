@@ -0,0 +1,215 @@
+"""Headless HTTP API for the career pipeline.
+
+Serves the same engine as the Streamlit app without the script reruns:
+
+    python api.py --port 8000
+
+Endpoints (JSON in and out):
+
+    POST /v1/intent   {"message": "..."}                    -> {"intent": "career"}
+    POST /v1/analyze  {"message": "..."} or {"skills": [..]} -> {"analysis", "keyword", "market"}
+                      add "enrich": false to skip the job, salary and course lookups;
+                      market "jobs" are ranked against the skills, with "match_score"
+    POST /v1/resume   PDF/DOCX body (or multipart field "file") -> {"skills": [...]}
+                      ?analyze=1 also returns the analysis and market data
+    GET  /v1/enrich?skill=...                               -> {"jobs", "salary", "courses", "stale"}
+    GET  /healthz, GET /metrics
+
+The Gemini client and HTTP connection pool are created once at startup and
+shared by every request; blocking pipeline calls run on a bounded thread pool
+so the event loop keeps accepting connections.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import tornado.web
+from dotenv import load_dotenv
+
+import engine
+import llm
+import market_data
+import prefetch
+import resume_parser
+import tracing
+
+logger = logging.getLogger(__name__)
+
+API_PORT = int(os.getenv("API_PORT", "8000"))
+# Requests handled at once; more wait in the event loop
+API_WORKERS = int(os.getenv("API_WORKERS", "32"))
+
+_executor = ThreadPoolExecutor(max_workers=API_WORKERS, thread_name_prefix="api")
+
+
+def _run_traced(path, fn, *args):
+    """Run `fn` as one traced turn, like a chat turn in the app."""
+    timer = tracing.TurnTimer(path)
+    try:
+        return fn(*args)
+    finally:
+        timer.finish()
+
+
+def _extract_and_store(data, mime_type, label):
+    """Extract a resume's skills and, like an upload in the app, prefetch its analysis and market data and store the profile.
+
+    Returns `(skills, error, prefetch)`; the prefetch is None for an unusable resume.
+    """
+    skills, error = engine.extract_resume(data, mime_type)
+    if error:
+        return skills, error, None
+    # Callers usually ask about the resume's skills next
+    handle = prefetch.start(skills)
+    try:
+        engine.store_profile(skills, label=label)
+    except Exception as e:
+        logger.warning("Could not store resume profile: %s", e)
+    return skills, error, handle
+
+
+class ApiError(tornado.web.HTTPError):
+    """An error reported to the client as {"error": message}."""
+
+    def __init__(self, status_code, message):
+        super().__init__(status_code, reason=None, log_message=message)
+        self.message = message
+
+
+class BaseHandler(tornado.web.RequestHandler):
+    def set_default_headers(self):
+        self.set_header("Content-Type", "application/json")
+
+    def write_error(self, status_code, **kwargs):
+        error = kwargs.get("exc_info", (None, None))[1]
+        message = getattr(error, "message", None) or self._reason
+        self.finish({"error": message})
+
+    def json_body(self):
+        try:
+            body = json.loads(self.request.body or b"{}")
+        except ValueError:
+            raise ApiError(400, "request body must be JSON")
+        if not isinstance(body, dict):
+            raise ApiError(400, "request body must be a JSON object")
+        return body
+
+    def text_field(self, body, name):
+        value = body.get(name)
+        if not isinstance(value, str) or not value.strip():
+            raise ApiError(400, f'"{name}" must be a non-empty string')
+        return value.strip()
+
+    async def run(self, path, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(_executor, _run_traced, path, fn, *args)
+
+
+class IntentHandler(BaseHandler):
+    async def post(self):
+        message = self.text_field(self.json_body(), "message")
+        self.write({"intent": await self.run("api.intent", engine.detect_message_type, message)})
+
+
+class AnalyzeHandler(BaseHandler):
+    async def post(self):
+        body = self.json_body()
+        enrich = body.get("enrich", True) is not False
+        if "skills" in body:
+            skills = body["skills"]
+            if not isinstance(skills, list) or not all(isinstance(s, str) for s in skills) or not skills:
+                raise ApiError(400, '"skills" must be a non-empty list of strings')
+            start = lambda: engine.start_resume_turn(", ".join(skills), enrich=enrich)
+        else:
+            skills = None
+            message = self.text_field(body, "message")
+            start = lambda: engine.start_career_turn(message, enrich=enrich)
+        try:
+            self.write(await self.run("api.analyze", lambda: engine.run_turn(start(), skills=skills)))
+        except engine.NotCareerQuestion as e:
+            raise ApiError(422, f"not a career question (intent: {e.intent})")
+
+
+class ResumeHandler(BaseHandler):
+    async def post(self):
+        if self.request.files.get("file"):
+            upload = self.request.files["file"][0]
+            data, mime_type, label = upload["body"], upload["content_type"], upload["filename"]
+        else:
+            data, mime_type, label = self.request.body, self.request.headers.get("Content-Type", "").split(";")[0].strip(), ""
+        if not data:
+            raise ApiError(400, "no resume in the request body")
+        if mime_type not in (resume_parser.PDF_MIME, resume_parser.DOCX_MIME):
+            raise ApiError(415, "upload a PDF or DOCX file")
+        if len(data) > resume_parser.MAX_BYTES:
+            raise ApiError(413, f"resumes larger than {resume_parser.MAX_BYTES // (1024 * 1024)} MB are not supported")
+
+        skills, error, handle = await self.run("api.resume", _extract_and_store, data, mime_type, label)
+        if error:
+            # A failed read or Gemini call is ours to retry; anything else is about the file
+            raise ApiError(503 if error.startswith(resume_parser.PROCESSING_ERROR) else 422, error)
+        result = {"skills": skills}
+        if self.get_query_argument("analyze", "0") == "1":
+            result.update(await self.run(
+                "api.resume-analyze",
+                lambda: engine.run_turn(handle.take_turn() or engine.start_resume_turn(", ".join(skills)), skills=skills),
+            ))
+        self.write(result)
+
+
+class EnrichHandler(BaseHandler):
+    async def get(self):
+        skill = self.get_query_argument("skill", "").strip()
+        if not skill:
+            raise ApiError(400, 'query parameter "skill" is required')
+        self.write(await self.run("api.enrich", market_data.fetch_market_data, skill))
+
+
+class HealthHandler(BaseHandler):
+    def get(self):
+        self.write({"status": "ok"})
+
+
+class MetricsHandler(BaseHandler):
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.write(tracing.render_metrics())
+
+
+def make_app():
+    return tornado.web.Application(
+        [
+            (r"/v1/intent", IntentHandler),
+            (r"/v1/analyze", AnalyzeHandler),
+            (r"/v1/resume", ResumeHandler),
+            (r"/v1/enrich", EnrichHandler),
+            (r"/healthz", HealthHandler),
+            (r"/metrics", MetricsHandler),
+        ],
+        # A little over the resume limit so oversized uploads get a clear error from the parser
+        max_body_size=resume_parser.MAX_BYTES + 1024 * 1024,
+    )
+
+
+async def serve(port):
+    # Create the long-lived clients before taking traffic
+    await asyncio.get_running_loop().run_in_executor(_executor, llm.get_model)
+    market_data.get_session()
+    make_app().listen(port, xheaders=True)
+    logger.info("Career API listening on port %d", port)
+    await asyncio.Event().wait()
+
+
+def main():
+    load_dotenv()
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="Headless HTTP API for the career pipeline")
+    parser.add_argument("--port", type=int, default=API_PORT)
+    args = parser.parse_args()
+    asyncio.run(serve(args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,22 @@
 import streamlit as st
-import google.generativeai as genai
-import requests
-from PyPDF2 import PdfReader
-import docx
-import faiss
-import numpy as np
+import html
+import logging
 import os
 from dotenv import load_dotenv
 
+import chat_history
+import engine
+import tracing
+import market_data
+import prefetch
+import resume_parser
+import semantic_cache
+
 # Load environment variables
 load_dotenv()
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(name)s %(levelname)s %(message)s")
+logger = logging.getLogger(__name__)
+tracing.start_metrics_server()
 
 # Initialize session state for page control
 if 'intro_shown' not in st.session_state:
@@ -121,241 +128,192 @@ def show_intro():
         st.session_state.intro_shown = True
         st.rerun()
 
-# Main app functionality
-def main_app():
-    # Get API keys from environment variables
-    GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "your-gemini-api-key")
-    JSEARCH_API_KEY = os.getenv("JSEARCH_API_KEY", "your-jsearch-api-key")
-    ADZUNA_APP_ID = os.getenv("ADZUNA_APP_ID", "your-adzuna-app-id")
-    ADZUNA_APP_KEY = os.getenv("ADZUNA_APP_KEY", "your-adzuna-app-key")
-    UDEMY_API_KEY = os.getenv("UDEMY_API_KEY", "your-udemy-api-key")
-    
-    # Configure Gemini API
-    genai.configure(api_key=GEMINI_API_KEY)
-    model = genai.GenerativeModel('gemini-2.0-flash')
-
-    # Initialize bot persona information
-    bot_persona = {
-        "name": "Career Path Oracle",
-        "personality": "helpful, friendly, and knowledgeable about careers",
-        "origin": "Created by a team of students (Pavan, Sakshi, and Kausar) as a project to help people find their ideal career paths",
-        "mission": "To help users explore career opportunities, analyze their skills, and find resources to enhance their professional growth",
-        "likes": "Helping people discover their passions and potential career paths",
-        "location": "Cloud-based and accessible from anywhere",
-        "hobbies": "Analyzing job markets, matching skills to careers, and finding learning resources"
+def render_career_answer(start, sections, intro, outro, timer, skills=None):
+    """
+    Stream the analysis into the chat message and fill in the job, salary and
+    course sections as each lookup completes.
+    `start()` starts the turn's stages (see `engine.start_career_turn`).
+    `sections` maps "analysis", "jobs", "salary" and "courses" to their heading
+    (which may use {skill}) and, for lookups, the message shown when nothing is found.
+    Job postings are ranked against `skills`, or the search keyword without them.
+    Returns the full response markdown for the chat history, and whether every
+    lookup finished before its deadline with live or fresh cached data.
+    Raises `engine.NotCareerQuestion`, with the sections cleared, when the
+    structured call finds the message is not a career question.
+    """
+    placeholders = {key: st.empty() for key in ("analysis", "jobs", "salary", "courses")}
+    bodies = {key: "_Loading..._" for key in placeholders}
+    searched = {}
+
+    def section_markdown(key):
+        heading = sections[key][0].format(skill=searched.get("skill", "your profile"))
+        prefix = f"{intro}\n\n" if key == "analysis" and intro else ""
+        return f"### {heading}\n{prefix}{bodies[key]}"
+
+    def show(key, body):
+        bodies[key] = body
+        placeholders[key].markdown(section_markdown(key))
+
+    for key in placeholders:
+        show(key, bodies[key])
+
+    formatters = {
+        "jobs": lambda jobs: engine.format_job_list(engine.rank_jobs(jobs, skills, searched.get("skill")), sections["jobs"][1]),
+        "salary": engine.format_salary,
+        "courses": lambda courses: engine.format_course_list(courses, sections["courses"][1]),
     }
-    
-    def respond_to_casual_chat(user_input):
-        """Generate responses for casual chat questions about the bot"""
-        prompt = f"""
-        You are the Career Path Oracle, an AI assistant specialized in career guidance.
-        
-        About you:
-        - Name: {bot_persona['name']}
-        - Personality: {bot_persona['personality']}
-        - Origin: {bot_persona['origin']}
-        - Mission: {bot_persona['mission']}
-        - Likes: {bot_persona['likes']}
-        - Location: {bot_persona['location']}
-        - Hobbies: {bot_persona['hobbies']}
-        
-        The user asks: "{user_input}"
-        
-        Respond in a friendly, conversational way as the Career Path Oracle. Keep your response focused and under 100 words.
-        After answering their casual question, gently steer the conversation back to career guidance by adding a question
-        about their career interests or skills at the end.
-        """
-        
-        try:
-            response = model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            return f"I'm the Career Path Oracle, here to help with your career questions! I encountered a small issue ({str(e)}), but I'm still here to assist you. What career path are you interested in exploring today?"
-
-    def analyze_skills(user_input):
-        try:
-            prompt = f"""
-            Analyze the user's input: "{user_input}"
-            Identify their top 3 skills and suggest 3 career paths.
-            Format the response as a bulleted list.
-            """
-            response = model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            return f"Error analyzing skills: {str(e)}"
-
-    def detect_message_type(user_input):
-        """
-        Detect if the user is having a casual chat or seeking career information
-        Returns: 
-        - "chat" for casual conversation about the bot
-        - "career" for career-related questions
-        - "greeting" for simple greetings
-        """
-        prompt = f"""
-        Analyze this message: "{user_input}"
-        
-        Categorize it as ONE of the following:
-        1. "greeting" - if it's just a simple hello or introduction
-        2. "chat" - if the user is asking personal questions about the bot itself (like "who are you", "where are you from", "what's your name", etc.)
-        3. "career" - if the user is asking about careers, jobs, skills, resume advice, or other professional topics
-        
-        Respond with ONLY "greeting", "chat", or "career".
-        """
-        
-        try:
-            response = model.generate_content(prompt)
-            result = response.text.strip().lower()
-            if result in ["greeting", "chat", "career"]:
-                return result
-            else:
-                # Default to career if classification fails
-                return "career"
-        except Exception as e:
-            # Default to career if there's an error
-            return "career"
-
-    def get_job_postings(skill):
-        try:
-            url = "https://jsearch.p.rapidapi.com/search"
-            headers = {
-                "X-RapidAPI-Key": JSEARCH_API_KEY,
-                "X-RapidAPI-Host": "jsearch.p.rapidapi.com"
-            }
-            params = {
-                "query": skill,
-                "page": 1,
-                "num_pages": 1
-            }
-            response = requests.get(url, headers=headers, params=params)
-            if response.status_code == 200:
-                return response.json().get("data", [])
-            return []
-        except Exception as e:
-            st.error(f"Error fetching job postings: {str(e)}")
-            return []
-
-    def extract_skills_from_resume(uploaded_file):
-        skills = []
-        try:
-            if uploaded_file.type == "application/pdf":
-                pdf = PdfReader(uploaded_file)
-                text = "\n".join([page.extract_text() for page in pdf.pages if page.extract_text()])
-            elif uploaded_file.type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-                doc = docx.Document(uploaded_file)
-                text = "\n".join([para.text for para in doc.paragraphs])
-            else:
-                return ["Unsupported file format. Please upload a PDF or DOCX file."]
-            
-            # Check if document contains the word "resume" (case-insensitive)
-            if "resume" not in text.lower() and "cv" not in text.lower():
-                return ["Not a valid resume - document does not contain valid resume content"]
-            
-            # Use Gemini to extract skills
-            prompt = f"""
-            Extract technical and professional skills from this resume text. 
-            Format as a comma-separated list.
-            
-            Resume text:
-            {text[:2000]}  # Limit text length to avoid exceeding token limits
-            """
-            
-            response = model.generate_content(prompt)
-            skills_text = response.text.strip()
-            skills = [skill.strip() for skill in skills_text.split(',')]
-            
-            if not skills:
-                # Fallback method if AI extraction fails
-                skills = [line.strip() for line in text.split("\n") if "skill" in line.lower()]
-                
-            return skills if skills else ["No skills found in resume"]
-                
-        except Exception as e:
-            return [f"Error processing file: {str(e)}"]
-
-    def get_salary_data(job_title):
-        try:
-            url = "https://api.adzuna.com/v1/api/jobs/gb/histogram"
-            params = {
-                "app_id": ADZUNA_APP_ID,
-                "app_key": ADZUNA_APP_KEY,
-                "what": job_title
-            }
-            response = requests.get(url, params=params)
-            if response.status_code == 200:
-                return response.json().get("median_salary", "N/A")
-            return "N/A"
-        except Exception as e:
-            st.error(f"Error fetching salary data: {str(e)}")
-            return "N/A"
-
-    def get_free_courses(skill):
-        try:
-            url = "https://udemy-paid-courses-for-free-api.p.rapidapi.com/rapidapi/courses/search"
-            headers = {
-                "X-RapidAPI-Key": UDEMY_API_KEY,
-                "X-RapidAPI-Host": "udemy-paid-courses-for-free-api.p.rapidapi.com"
-            }
-            params = {
-                "query": skill,
-                "language": "en",
-                "page": 1,
-                "page_size": 10
-            }
-            response = requests.get(url, headers=headers, params=params)
-            if response.status_code == 200:
-                courses = response.json().get("courses", [])
-                return courses[:3] if courses else []
-            return []
-        except Exception as e:
-            st.error(f"Error fetching courses: {str(e)}")
-            return []
-
-    # Vector database initialization
-    dimension = 128
-    index = faiss.IndexFlatL2(dimension)
-
-    def store_user_vector(user_skills):
-        try:
-            # Generate a simple vector representation of skills
-            # In a real application, you would use embeddings from an NLP model
-            vector = np.random.rand(1, dimension).astype('float32')
-            index.add(vector)
-            return True
-        except Exception as e:
-            st.error(f"Error storing vector: {str(e)}")
-            return False
+    pending, stale = set(formatters), False
+
+    def on_event(name, value):
+        nonlocal stale
+        if name == "keyword":
+            searched["skill"] = value
+            for key in placeholders:
+                show(key, bodies[key])
+        elif name == "analysis":
+            timer.first_token()
+            show(name, value)
+        else:
+            result, stale_age = value
+            body = formatters[name](result)
+            if stale_age is not None:
+                body = f"{body}\n\n{engine.format_stale_note(stale_age)}"
+                stale = True
+            show(name, body)
+            pending.discard(name)
+
+    # Lookups that finish while the analysis streams are shown straight away;
+    # once it is done, the rest get the usual deadline
+    run = start()
+    try:
+        for name, value, done in run.events(["keyword", "analysis", *formatters]):
+            on_event(name, value)
+            if name == "analysis" and done:
+                break
+        waiting = ([] if "skill" in searched else ["keyword"]) + sorted(pending)
+        for name, value, done in run.events(waiting, timeout=market_data.LOOKUP_DEADLINE):
+            on_event(name, value)
+    except engine.NotCareerQuestion:
+        for placeholder in placeholders.values():
+            placeholder.empty()
+        raise
+    finally:
+        run.cancel()
+    for key in pending:
+        show(key, formatters[key](market_data.EMPTY_RESULTS[key]))
+
+    st.markdown(outro)
+    response = "\n\n".join([section_markdown(key) for key in placeholders] + [outro])
+    return response, not pending and not stale
+
+def answer_namespace():
+    """Semantic cache namespace: answers may depend on the uploaded resume's skills"""
+    if not st.session_state.valid_resume:
+        return ""
+    return "|".join(sorted(skill.lower() for skill in st.session_state.resume_skills))
+
+def record_turn(timer):
+    """Keep the latest turn timings (time to first token and total) in the session"""
+    st.session_state.turn_metrics.append(timer.finish())
+    del st.session_state.turn_metrics[:-50]
+
+SPAN_COLORS = {"llm": "#9b59b6", "http": "#e67e22", "stage": "#4A90E2"}
+
+def render_trace_waterfall(metrics):
+    """Draw the spans of a finished turn as a waterfall, offset by their start time"""
+    total = max(metrics["total_ms"], 1)
+    st.subheader("Turn Trace")
+    st.caption(f"{metrics['path']}: first token {metrics['ttft_ms']:.0f} ms, total {metrics['total_ms']:.0f} ms")
+    rows = []
+    for span in metrics["spans"]:
+        left = min(span["start_ms"] / total * 100, 99.5)
+        width = max(min(span["duration_ms"] / total * 100, 100 - left), 0.5)
+        label = html.escape(f"{span['name']} · {span['duration_ms']:.0f} ms · {span['status']}")
+        rows.append(f"""
+        <div style="font-size: 0.75rem; margin: 2px 0 0 {span['depth'] * 0.75}rem;">{label}</div>
+        <div style="position: relative; height: 6px; background: #f0f2f6; border-radius: 3px;">
+            <div style="position: absolute; left: {left:.2f}%; width: {width:.2f}%; height: 6px;
+                        background: {SPAN_COLORS.get(span['kind'], '#888')}; border-radius: 3px;"></div>
+        </div>""")
+    st.markdown("".join(rows) or "_No spans recorded._", unsafe_allow_html=True)
+
+def start_prefetch(skills):
+    """Start a newly uploaded resume's analysis and warm its market data, once per resume"""
+    current = st.session_state.get("prefetch")
+    if current is not None and current.skills == tuple(skills):
+        return
+    cancel_prefetch()
+    st.session_state.prefetch = prefetch.start(skills)
+
+def start_resume_turn(skills):
+    """The resume's analysis turn, taken over from its prefetch when that started one"""
+    current = st.session_state.get("prefetch")
+    run = current.take_turn() if current is not None and current.skills == tuple(skills) else None
+    return run or engine.start_resume_turn(", ".join(skills))
+
+def cancel_prefetch():
+    current = st.session_state.pop("prefetch", None)
+    if current is not None:
+        current.cancel()
+
+def store_user_vector(user_skills, label="", digest=None):
+    """Add the resume's skills to the shared index, once per resume"""
+    if digest is not None and st.session_state.get("stored_resume") == digest:
+        return True
+    try:
+        engine.store_profile(user_skills, label=label)
+        st.session_state.stored_resume = digest
+        return True
+    except Exception as e:
+        st.error(f"Error storing vector: {str(e)}")
+        return False
 
+# Main app functionality
+def main_app():
     st.title("Career Path Oracle 🧙")
 
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
+    if "history" not in st.session_state:
+        st.session_state.history = chat_history.ChatHistory()
+    if "history_shown" not in st.session_state:
+        st.session_state.history_shown = chat_history.PAGE_SIZE
     if "valid_resume" not in st.session_state:
         st.session_state.valid_resume = False
     if "resume_skills" not in st.session_state:
         st.session_state.resume_skills = []
     if "chat_count" not in st.session_state:
         st.session_state.chat_count = 0
+    if "turn_metrics" not in st.session_state:
+        st.session_state.turn_metrics = []
 
     with st.sidebar:
         st.header("Upload Your Resume")
         uploaded_file = st.file_uploader("Choose a file", type=["pdf", "docx"])
         if uploaded_file is not None:
             with st.spinner("Analyzing resume..."):
-                resume_skills = extract_skills_from_resume(uploaded_file)
-                
-                if "Not a valid resume" in resume_skills[0] or "Error" in resume_skills[0]:
-                    st.error(resume_skills[0])
+                upload_timer = tracing.TurnTimer("resume-upload")
+                resume_skills, resume_error = engine.extract_resume(uploaded_file.getvalue(), uploaded_file.type)
+                # Only uploads that were actually parsed (not memoized) are worth a trace
+                if upload_timer.spans:
+                    record_turn(upload_timer)
+                else:
+                    upload_timer.discard()
+
+                if resume_error:
+                    st.error(resume_error)
                     st.session_state.valid_resume = False
+                    cancel_prefetch()
                 else:
+                    start_prefetch(resume_skills)
                     st.success(f"Resume uploaded: {uploaded_file.name}")
                     st.write("### Skills Found:")
                     st.write(", ".join(resume_skills))
-                    if store_user_vector(resume_skills):
+                    digest = resume_parser.resume_digest(uploaded_file.getvalue(), uploaded_file.type)
+                    if store_user_vector(resume_skills, label=uploaded_file.name, digest=digest):
                         st.session_state.resume_skills = resume_skills
                         st.session_state.valid_resume = True
         else:
             st.session_state.valid_resume = False
+            cancel_prefetch()
 
         st.write("---")
         st.subheader("About Me")
@@ -379,8 +337,13 @@ def main_app():
         st.write("Sakshi - 12306499")
         st.write("Kausar - 12316343")
 
-    # Display previous messages
-    for message in st.session_state.messages:
+    # Display the latest messages; older ones are read back from disk only when asked for
+    history = st.session_state.history
+    hidden = len(history) - st.session_state.history_shown
+    if hidden > 0 and st.button(f"Load earlier messages ({hidden} more)", key="load_earlier"):
+        st.session_state.history_shown += chat_history.PAGE_SIZE
+        st.rerun()
+    for message in history.last(st.session_state.history_shown):
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
 
@@ -390,151 +353,138 @@ def main_app():
     # Process user input or resume upload
     if user_input:
         # Add user message to chat history
-        st.session_state.messages.append({"role": "user", "content": user_input})
+        # Only follow-ups carry the conversation; standalone questions stay cacheable
+        context = history.context_for(user_input)
+        history.append("user", user_input)
+        st.session_state.history_shown = chat_history.PAGE_SIZE
         with st.chat_message("user"):
             st.markdown(user_input)
         
         with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                # Detect message type - whether casual chat or career question
-                message_type = detect_message_type(user_input)
-                
+            timer = tracing.TurnTimer("turn")
+            # Near-duplicates of earlier questions are answered from the semantic cache,
+            # except follow-ups, whose answers the conversation's history shapes
+            cache = semantic_cache.get_semantic_cache() if not context else None
+            namespace = answer_namespace()
+            cached = cache.lookup(user_input, namespace) if cache is not None else None
+
+            if cached is not None:
+                message_type, response = cached["message_type"], cached["response"]
+                timer.path = f"{message_type}-cached"
+                timer.first_token()
+                st.markdown(response)
+            else:
+                with st.spinner("Thinking..."):
+                    # Detect message type - whether casual chat or career question
+                    structured_turn = {}
+                    message_type = engine.detect_message_type(user_input, structured_turn, context)
+                timer.path = message_type
+                cacheable = False
+
+                if message_type == "career":
+                    # It's a career-related question
+                    try:
+                        response, cacheable = render_career_answer(
+                            lambda: engine.start_career_turn(user_input, structured_turn, context=context),
+                            {
+                                "analysis": ("Analysis Results:", None),
+                                "jobs": ("Related Job Postings:", "No related job postings found. Try a different query."),
+                                "salary": ("Salary Insights:", None),
+                                "courses": ("Free Courses to Learn:", "No courses found. Try searching for more specific skills."),
+                            },
+                            intro="",
+                            outro="Would you like more specific information about any of these career paths or skills?",
+                            timer=timer,
+                            skills=st.session_state.resume_skills if st.session_state.valid_resume else None,
+                        )
+                    except engine.NotCareerQuestion as e:
+                        # The structured call overrules a local classifier that took chat for a career question
+                        message_type = timer.path = e.intent
+                    except Exception as e:
+                        response = f"I encountered an issue while analyzing your request: {str(e)}. Could you please rephrase or provide more details about what you're looking for?"
+                        st.markdown(response)
+
                 # Handle based on message type
                 if message_type == "greeting":
                     # It's a simple greeting
-                    greeting_prompt = f"""
-                    The user says: "{user_input}"
-                    
-                    Respond with a warm, friendly greeting as the Career Path Oracle. 
-                    Include a brief introduction about what you can help with (career guidance, skill analysis, etc.).
-                    Keep it under 3 sentences.
-                    """
-                    greeting_response = model.generate_content(greeting_prompt)
-                    response = greeting_response.text
-                    
+                    response = st.write_stream(engine.stream_reply(engine.greeting_prompt(user_input), "Hello! I'm the Career Path Oracle. ({error})", timer))
+
                 elif message_type == "chat":
                     # It's a casual chat about the bot itself
-                    st.session_state.chat_count += 1
-                    response = respond_to_casual_chat(user_input)
-                    
-                else:
-                    # It's a career-related question
-                    # Reset chat counter when user asks career questions
-                    st.session_state.chat_count = 0
-                    
-                    # Proceed with skill analysis
-                    analysis = analyze_skills(user_input)
-                    
-                    # Extract a key skill to search for jobs and courses
-                    skill_prompt = f"Extract a single professional skill or job title from this text: '{user_input}'. Give only the skill or job title, nothing else."
-                    skill_response = model.generate_content(skill_prompt)
-                    skill = skill_response.text.strip()
-                    
-                    # Get supporting data
-                    jobs = get_job_postings(skill)
-                    salary = get_salary_data(skill)
-                    courses = get_free_courses(skill)
-                    
-                    # Format response
-                    try:
-                        job_list = "\n".join([f"- {job.get('job_title', 'N/A')} at {job.get('employer_name', 'N/A')}" for job in jobs[:3]]) if jobs else "No related job postings found. Try a different query."
-                        
-                        course_list = "\n".join([f"- [{course.get('title', 'N/A')}]({course.get('url', '#')})" for course in courses[:3]]) if courses else "No courses found. Try searching for more specific skills."
-                        
-                        response = f"""
-                        ### Analysis Results:
-                        {analysis}
-
-                        ### Related Job Postings:
-                        {job_list}
-
-                        ### Salary Insights:
-                        Median Salary: {salary if salary != "N/A" else "Data not available"}
-
-                        ### Free Courses to Learn:
-                        {course_list}
-                        
-                        Would you like more specific information about any of these career paths or skills?
-                        """
-                    except Exception as e:
-                        response = f"I encountered an issue while analyzing your request: {str(e)}. Could you please rephrase or provide more details about what you're looking for?"
-                
-                # Gently redirect if too much casual chat
-                if st.session_state.chat_count > 3:
-                    career_prompt = "\n\nI'm happy to chat, but I'm specialized in career guidance. Is there anything about your career path or skills I can help you with today?"
-                    response += career_prompt
-                
-                st.markdown(response)
-                
-                # Add feedback options
-                col1, col2 = st.columns(2)
-                with col1:
-                    if st.button("👍 Helpful", key="helpful"):
-                        st.success("Thank you! I'll keep improving my recommendations.")
-                with col2:
-                    if st.button("👎 Not Helpful", key="not_helpful"):
-                        st.info("I appreciate your feedback. Let me know how I can do better!")
+                    errors = []
+                    response = st.write_stream(engine.respond_to_casual_chat(user_input, timer, errors, context))
+                    cacheable = not errors
+
+                if cacheable and cache is not None:
+                    cache.store(user_input, {"message_type": message_type, "response": response}, namespace)
+
+            if message_type == "chat":
+                st.session_state.chat_count += 1
+            elif message_type == "career":
+                # Reset chat counter when user asks career questions
+                st.session_state.chat_count = 0
+
+            # Gently redirect if too much casual chat
+            if st.session_state.chat_count > 3:
+                career_prompt = "\n\nI'm happy to chat, but I'm specialized in career guidance. Is there anything about your career path or skills I can help you with today?"
+                st.markdown(career_prompt)
+                response += career_prompt
+
+            record_turn(timer)
+            
+            # Add feedback options
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("👍 Helpful", key="helpful"):
+                    st.success("Thank you! I'll keep improving my recommendations.")
+            with col2:
+                if st.button("👎 Not Helpful", key="not_helpful"):
+                    st.info("I appreciate your feedback. Let me know how I can do better!")
         
         # Add assistant message to chat history
-        st.session_state.messages.append({"role": "assistant", "content": response})
+        history.append("assistant", response)
     
     # Handle resume upload feedback
-    elif st.session_state.valid_resume and len(st.session_state.messages) == 0:
+    elif st.session_state.valid_resume and len(history) == 0:
         # Only process if we have a valid resume but haven't responded yet
         with st.chat_message("assistant"):
-            with st.spinner("Analyzing your resume..."):
-                all_skills = ", ".join(st.session_state.resume_skills)
-                analysis = analyze_skills(all_skills)
-                
-                # Extract a primary skill/job title from the resume
-                skill_prompt = f"Based on these skills: {all_skills}, what would be the most relevant job title to search for? Give only the job title, nothing else."
-                skill_response = model.generate_content(skill_prompt)
-                skill = skill_response.text.strip()
-                
-                # Get supporting data
-                jobs = get_job_postings(skill)
-                salary = get_salary_data(skill)
-                courses = get_free_courses(skill)
-                
-                # Format response
-                try:
-                    job_list = "\n".join([f"- {job.get('job_title', 'N/A')} at {job.get('employer_name', 'N/A')}" for job in jobs[:3]]) if jobs else "No related job postings found."
-                    
-                    course_list = "\n".join([f"- [{course.get('title', 'N/A')}]({course.get('url', '#')})" for course in courses[:3]]) if courses else "No relevant courses found."
-                    
-                    response = f"""
-                    ### Resume Analysis Results:
-                    Based on your resume, here's my assessment:
-                    
-                    {analysis}
-
-                    ### Recommended Job Postings:
-                    {job_list}
-
-                    ### Salary Insights for {skill}:
-                    Median Salary: {salary if salary != "N/A" else "Data not available"}
-
-                    ### Recommended Learning Resources:
-                    {course_list}
-                    
-                    Is there a specific career path you're most interested in exploring further?
-                    """
-                except Exception as e:
-                    response = f"I encountered an issue while analyzing your resume: {str(e)}. Could you please try uploading it again or describe your skills directly?"
-                
+            timer = tracing.TurnTimer("resume")
+            try:
+                response, _ = render_career_answer(
+                    lambda: start_resume_turn(st.session_state.resume_skills),
+                    {
+                        "analysis": ("Resume Analysis Results:", None),
+                        "jobs": ("Recommended Job Postings:", "No related job postings found."),
+                        "salary": ("Salary Insights for {skill}:", None),
+                        "courses": ("Recommended Learning Resources:", "No relevant courses found."),
+                    },
+                    intro="Based on your resume, here's my assessment:",
+                    outro="Is there a specific career path you're most interested in exploring further?",
+                    timer=timer,
+                    skills=st.session_state.resume_skills,
+                )
+            except Exception as e:
+                response = f"I encountered an issue while analyzing your resume: {str(e)}. Could you please try uploading it again or describe your skills directly?"
                 st.markdown(response)
-                
-                # Add feedback options
-                col1, col2 = st.columns(2)
-                with col1:
-                    if st.button("👍 Helpful", key="resume_helpful"):
-                        st.success("Thank you! I'll keep improving my recommendations.")
-                with col2:
-                    if st.button("👎 Not Helpful", key="resume_not_helpful"):
-                        st.info("I appreciate your feedback. Let me know how I can do better!")
+
+            record_turn(timer)
+            
+            # Add feedback options
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("👍 Helpful", key="resume_helpful"):
+                    st.success("Thank you! I'll keep improving my recommendations.")
+            with col2:
+                if st.button("👎 Not Helpful", key="resume_not_helpful"):
+                    st.info("I appreciate your feedback. Let me know how I can do better!")
             
             # Add assistant message to chat history
-            st.session_state.messages.append({"role": "assistant", "content": response})
+            history.append("assistant", response)
+
+    if tracing.PANEL_ENABLED and st.session_state.turn_metrics:
+        with st.sidebar:
+            st.write("---")
+            render_trace_waterfall(st.session_state.turn_metrics[-1])
 
 # Main app entry point
 if not st.session_state.intro_shown:
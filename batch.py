@@ -0,0 +1,280 @@
+"""Bulk resume analysis from the command line.
+
+Walks directories and .zip/.tar(.gz) archives of PDF and DOCX resumes,
+extracts their text in a process pool, and runs Gemini skill extraction
+(and, unless --no-title, a suggested job title) on a bounded, rate-limited
+set of threads. One JSON object per resume is appended to the output as soon
+as it is done:
+
+    python batch.py resumes/ candidates.zip -o results.jsonl --workers 8 \\
+        --llm-concurrency 16 --llm-rpm 600
+
+Each line has "file", "digest", "skills", "title", "error" and "elapsed_ms".
+Re-running with the same output skips resumes already recorded there, so an
+interrupted run continues where it stopped; --retry-errors also redoes the
+ones that failed. Identical files (by content hash) are analyzed once.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import tarfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+import llm
+import ratelimit
+import resume_parser
+
+logger = logging.getLogger(__name__)
+
+MIME_TYPES = {".pdf": resume_parser.PDF_MIME, ".docx": resume_parser.DOCX_MIME}
+# Errors that will not go away on a retry
+PERMANENT_ERRORS = (resume_parser.NOT_A_RESUME, resume_parser.NO_SKILLS, resume_parser.UNSUPPORTED_FORMAT, "File too large")
+
+
+def _mime_type(name):
+    return MIME_TYPES.get(os.path.splitext(name)[1].lower())
+
+
+def iter_resumes(paths):
+    """Yield `(name, mime_type, read)` for every PDF/DOCX under `paths`.
+
+    `paths` may be files, directories (walked recursively) or zip/tar
+    archives; archive members are named "archive::member". `read()` returns
+    the file's bytes.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    full = os.path.join(root, name)
+                    if _mime_type(name):
+                        yield full, _mime_type(name), lambda full=full: _read_file(full)
+        elif zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir() and _mime_type(info.filename):
+                        yield f"{path}::{info.filename}", _mime_type(info.filename), lambda info=info: archive.read(info)
+        elif tarfile.is_tarfile(path):
+            with tarfile.open(path) as archive:
+                for member in archive:
+                    if member.isfile() and _mime_type(member.name):
+                        yield f"{path}::{member.name}", _mime_type(member.name), lambda member=member: archive.extractfile(member).read()
+        elif _mime_type(path):
+            yield path, _mime_type(path), lambda path=path: _read_file(path)
+        else:
+            logger.warning("Skipping %s: not a PDF, DOCX, directory or archive", path)
+
+
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _parse(data, mime_type):
+    """Extract a resume's text. Runs in a worker process."""
+    return resume_parser.extract_text(data, mime_type, workers=1)
+
+
+def load_done(output, retry_errors=False):
+    """Return `{file: record}` for resumes already in `output` (the last record per file wins)."""
+    done = {}
+    if not os.path.exists(output):
+        return done
+    with open(output, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by an interrupted run
+                continue
+            done[record["file"]] = record
+    if retry_errors:
+        done = {
+            name: record for name, record in done.items()
+            if not record.get("error") or record["error"].startswith(PERMANENT_ERRORS)
+        }
+    return done
+
+
+class BatchRun:
+    """One bulk run: a producer feeding the parse pool, LLM threads, and the JSONL writer."""
+
+    def __init__(self, paths, output, workers, llm_concurrency, llm_rpm, titles=True, retry_errors=False):
+        self.paths = paths
+        self.output = output
+        self.workers = workers
+        self.titles = titles
+        self.done = load_done(output, retry_errors)
+        # Every Gemini call goes through the shared "gemini" limiter, which also retries 429s
+        ratelimit.get_limiter("gemini").configure(llm_rpm / 60, capacity=max(1, llm_concurrency))
+        self.model = llm.get_model()
+        self.parse_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        self.llm_pool = ThreadPoolExecutor(max_workers=llm_concurrency, thread_name_prefix="batch-llm")
+        # Resumes between reading and writing; bounds memory for huge inputs
+        self.slots = threading.BoundedSemaphore(max(2 * workers, 2 * llm_concurrency))
+        self.results = queue.Queue()
+        self.by_digest = {r["digest"]: r for r in self.done.values() if r.get("digest") and not r.get("error")}
+        self.stop = threading.Event()
+        self.counts = {"skipped": 0, "processed": 0, "errors": 0}
+
+    def _record(self, name, digest, started, skills=None, title=None, error=None):
+        return {
+            "file": name,
+            "digest": digest,
+            "skills": skills or [],
+            "title": title,
+            "error": error,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    def _analyze(self, name, digest, text, started):
+        skills, error = resume_parser.skills_from_text(text, self.model)
+        if error is not None:
+            return self._record(name, digest, started, error=error)
+        title = None
+        if self.titles:
+            try:
+                title = llm.analyze_resume_turn(self.model, ", ".join(skills))["keyword"]
+            except Exception as e:
+                logger.warning("No title for %s: %s", name, e)
+        return self._record(name, digest, started, skills=skills, title=title)
+
+    def _on_parsed(self, name, digest, started, future):
+        if future.cancelled():
+            self.results.put(None)
+            return
+        try:
+            text = future.result()
+        except Exception as e:
+            self.results.put(self._record(name, digest, started, error=f"Error processing file: {e}"))
+            return
+
+        def analyze():
+            try:
+                self.results.put(self._analyze(name, digest, text, started))
+            except Exception as e:
+                self.results.put(self._record(name, digest, started, error=f"Error processing file: {e}"))
+
+        try:
+            self.llm_pool.submit(analyze)
+        except RuntimeError:
+            # Pool shut down by an interrupt
+            self.results.put(None)
+
+    def _produce(self):
+        submitted = 0
+        try:
+            for name, mime_type, read in iter_resumes(self.paths):
+                if self.stop.is_set():
+                    break
+                if name in self.done:
+                    self.counts["skipped"] += 1
+                    continue
+                self.slots.acquire()
+                submitted += 1
+                started = time.perf_counter()
+                try:
+                    data = read()
+                except (OSError, tarfile.TarError, zipfile.BadZipFile) as e:
+                    self.results.put(self._record(name, None, started, error=f"Error processing file: {e}"))
+                    continue
+                digest = resume_parser.resume_digest(data, mime_type)
+                if digest in self.by_digest:
+                    previous = self.by_digest[digest]
+                    self.results.put(self._record(name, digest, started, skills=previous["skills"], title=previous["title"]))
+                elif len(data) > resume_parser.MAX_BYTES:
+                    self.results.put(self._record(name, digest, started, error=f"File too large: {len(data)} bytes"))
+                else:
+                    try:
+                        future = self.parse_pool.submit(_parse, data, mime_type)
+                    except RuntimeError:
+                        # Pool shut down by an interrupt
+                        self.results.put(None)
+                        break
+                    future.add_done_callback(
+                        lambda f, name=name, digest=digest, started=started: self._on_parsed(name, digest, started, f)
+                    )
+        except Exception as e:
+            logger.error("Stopped reading inputs: %s", e)
+        finally:
+            self.results.put(("end", submitted))
+
+    def run(self):
+        producer = threading.Thread(target=self._produce, name="batch-producer", daemon=True)
+        producer.start()
+        written, expected, last_report = 0, None, time.perf_counter()
+        run_started = last_report
+        with open(self.output, "a+", encoding="utf-8") as out:
+            # Continue on a fresh line after a record cut short by an interrupted run
+            out.seek(0, os.SEEK_END)
+            if out.tell():
+                out.seek(out.tell() - 1)
+                if out.read(1) != "\n":
+                    out.write("\n")
+            try:
+                while expected is None or written < expected:
+                    item = self.results.get()
+                    if isinstance(item, tuple):
+                        expected = item[1]
+                        continue
+                    written += 1
+                    self.slots.release()
+                    if item is None:
+                        continue
+                    out.write(json.dumps(item) + "\n")
+                    out.flush()
+                    self.counts["processed"] += 1
+                    self.counts["errors"] += bool(item["error"])
+                    if not item["error"]:
+                        self.by_digest.setdefault(item["digest"], item)
+                    if time.perf_counter() - last_report > 10:
+                        last_report = time.perf_counter()
+                        rate = self.counts["processed"] / (last_report - run_started)
+                        logger.info("%d resumes done (%.1f/s), %d errors", self.counts["processed"], rate, self.counts["errors"])
+            except KeyboardInterrupt:
+                logger.warning("Interrupted; rerun with the same output to continue")
+                self.stop.set()
+                raise
+            finally:
+                self.llm_pool.shutdown(wait=False, cancel_futures=True)
+                self.parse_pool.shutdown(wait=False, cancel_futures=True)
+        elapsed = time.perf_counter() - run_started
+        return dict(self.counts, seconds=round(elapsed, 1))
+
+
+def main():
+    load_dotenv()
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="Analyze a directory or archive of resumes")
+    parser.add_argument("paths", nargs="+", help="resume files, directories, or .zip/.tar archives")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file to append results to")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes extracting text")
+    parser.add_argument("--llm-concurrency", type=int, default=8, help="Gemini calls in flight at once")
+    parser.add_argument("--llm-rpm", type=float, default=300, help="Gemini requests per minute")
+    parser.add_argument("--no-title", action="store_true", help="skip the suggested job title (one fewer call per resume)")
+    parser.add_argument("--retry-errors", action="store_true", help="redo resumes whose earlier attempt failed")
+    args = parser.parse_args()
+
+    run = BatchRun(
+        args.paths, args.output, args.workers, args.llm_concurrency, args.llm_rpm,
+        titles=not args.no_title, retry_errors=args.retry_errors,
+    )
+    try:
+        summary = run.run()
+    except KeyboardInterrupt:
+        sys.exit(130)
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""Local stand-ins for Gemini and the JSearch, Adzuna and Udemy endpoints.
+
+Each stand-in has a configurable latency (mean and jitter, in milliseconds)
+and failure rate, so the app can be exercised offline under realistic and
+degraded upstream conditions.
+"""
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+@dataclass
+class Profile:
+    """Latency and failure behaviour of one fake upstream."""
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    failure_rate: float = 0.0
+
+    def delay(self):
+        seconds = max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+        time.sleep(seconds)
+
+    def fails(self):
+        return random.random() < self.failure_rate
+
+    @classmethod
+    def parse(cls, spec):
+        """Parse "latency[,jitter[,failure_rate]]", e.g. "200,50,0.05"."""
+        parts = [float(p) for p in spec.split(",")] if spec else []
+        return cls(*parts)
+
+
+# ---------------------------------------------------------------------------
+# Gemini
+
+
+class _Reply:
+    def __init__(self, text):
+        self.text = text
+
+
+class _StreamedReply:
+    def __init__(self, chunks, profile):
+        self._chunks = chunks
+        self._profile = profile
+
+    def __iter__(self):
+        for i, chunk in enumerate(self._chunks):
+            if i:
+                # Spread a fifth of the latency across the remaining chunks
+                time.sleep(self._profile.latency_ms / 5000 / len(self._chunks))
+            yield _Reply(chunk)
+
+
+class FakeGenerativeModel:
+    """Drop-in for `google.generativeai.GenerativeModel` with canned replies."""
+
+    profile = Profile(latency_ms=300, jitter_ms=50)
+    calls = 0
+    _calls_lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    @staticmethod
+    def reply_for(prompt):
+        if "JSON object" in prompt:
+            return json.dumps({
+                "intent": "career",
+                "keyword": "data scientist",
+                "skills": ["Python", "SQL", "Statistics"],
+                "career_paths": [
+                    "Data Scientist - builds models from business data",
+                    "Machine Learning Engineer - ships models to production",
+                    "Data Analyst - turns data into decisions",
+                ],
+            })
+        if "Respond with ONLY" in prompt:
+            return "career"
+        if "comma-separated" in prompt:
+            return "Python, SQL, Pandas, Docker, Statistics"
+        if "job title" in prompt:
+            return "Data Scientist"
+        return "Hello! I'm the Career Path Oracle. I can help you explore careers, skills and learning resources."
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        with self._calls_lock:
+            FakeGenerativeModel.calls += 1
+        # Time to first token; streamed replies trickle the rest out
+        self.profile.delay()
+        if self.profile.fails():
+            raise RuntimeError("429 Resource has been exhausted (fake)")
+        text = self.reply_for(prompt)
+        if stream:
+            return _StreamedReply([text[i:i + 24] for i in range(0, len(text), 24)], self.profile)
+        return _Reply(text)
+
+
+def install_fake_gemini(profile):
+    """Route every Gemini call through `FakeGenerativeModel`."""
+    import google.generativeai as genai
+
+    import llm
+
+    FakeGenerativeModel.profile = profile
+    genai.GenerativeModel = FakeGenerativeModel
+    genai.configure = lambda **kwargs: None
+    llm._model = None
+
+
+# ---------------------------------------------------------------------------
+# Market-data APIs
+
+
+_STACKS = ["Python, SQL and Airflow", "Java, Spring and Kubernetes", "React, TypeScript and CSS", "Pandas, Statistics and Docker", "Go, AWS and Terraform"]
+
+_PAYLOADS = {
+    "jsearch": lambda query, page=1, num_pages=1: {"data": [
+        {
+            "job_id": f"{query}-{p}-{i}",
+            "job_title": f"{query.title()} {level}",
+            "employer_name": f"Employer {p}-{i}",
+            "job_description": f"We need {query} experience with {_STACKS[(i + p) % len(_STACKS)]}.",
+        }
+        for p in range(page, page + num_pages)
+        for i, level in enumerate(["Intern", "Associate", "Senior", "Lead", "Principal"] * 2)
+    ]},
+    "adzuna": lambda query, page=1, num_pages=1: {"median_salary": 55000 + len(query) * 100},
+    "udemy": lambda query, page=1, num_pages=1: {"courses": [
+        {"title": f"{query.title()} Course {i}", "url": f"https://example.com/{i}"} for i in range(5)
+    ]},
+}
+
+
+class FakeMarketServer:
+    """Threaded HTTP server answering /jsearch, /adzuna and /udemy with canned JSON."""
+
+    def __init__(self, profiles):
+        self.profiles = profiles
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                from urllib.parse import parse_qs, urlparse
+
+                url = urlparse(self.path)
+                provider = url.path.strip("/")
+                params = parse_qs(url.query)
+                query = (params.get("query") or params.get("what") or [""])[0]
+                profile = server.profiles.get(provider, Profile())
+                server.requests += 1
+                profile.delay()
+                if provider not in _PAYLOADS:
+                    status, payload = 404, {"error": "unknown provider"}
+                elif profile.fails():
+                    status, payload = random.choice([(429, {"message": "Too many requests"}), (500, {"message": "boom"})])
+                else:
+                    page, num_pages = (int((params.get(name) or ["1"])[0]) for name in ("page", "num_pages"))
+                    status, payload = 200, _PAYLOADS[provider](query, page, num_pages)
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def urls(self):
+        """Environment overrides pointing market_data at this server."""
+        return {
+            "JSEARCH_URL": f"{self.base_url}/jsearch",
+            "ADZUNA_URL": f"{self.base_url}/adzuna",
+            "UDEMY_URL": f"{self.base_url}/udemy",
+        }
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def make_resume(variant):
+    """Build a small DOCX resume; `variant` makes its bytes unique so memoization is bypassed."""
+    import io
+
+    import docx
+
+    doc = docx.Document()
+    doc.add_heading(f"Resume - Candidate {variant}", level=1)
+    doc.add_paragraph("Skills: Python, SQL, Pandas, Docker, Statistics")
+    doc.add_paragraph("Experience: 3 years building data pipelines and dashboards.")
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
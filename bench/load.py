@@ -0,0 +1,260 @@
+"""Offline latency and throughput benchmark for the greeting, chat, career and resume paths.
+
+Gemini and the three market-data APIs are replaced by local stand-ins (see
+bench/fakes.py) with configurable latency and failure rates, and `main_app`
+is driven through Streamlit's AppTest with increasing numbers of concurrent
+sessions, one process each. Nothing touches the network, so it can run in CI:
+
+    python bench/load.py --concurrency 1,4,8 --turns 5
+    python bench/load.py --save-baseline bench-baseline.json
+    python bench/load.py --baseline bench-baseline.json --tolerance 1.3
+
+Latencies are per turn (one chat message, or the resume upload and its
+analysis) and cover the whole rerun, so they include AppTest overhead.
+With --baseline the run fails if any path's p95 regresses beyond the tolerance.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fakes import FakeGenerativeModel, FakeMarketServer, Profile, install_fake_gemini, make_resume  # noqa: E402
+
+PATHS = ("greeting", "chat", "career", "resume")
+QUESTIONS = {
+    "greeting": ["hello", "hi there", "good morning"],
+    "chat": ["who are you?", "What are you? Who created you?", "where are you from?"],
+    "career": [
+        "What skills do I need for data science?",
+        "What are the best career paths for Python developers?",
+        "How can I transition to AI engineering?",
+    ],
+}
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def install_fake_uploader():
+    """Let a session 'upload' the resume stored in its `_bench_resume` state.
+
+    AppTest cannot drive st.file_uploader, so the benchmark swaps it for a
+    function returning an in-memory file when the session asks for one.
+    """
+    import streamlit as st
+
+    original = st.file_uploader
+
+    class _Upload:
+        type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+        name = "resume.docx"
+
+        def __init__(self, data):
+            self._data = data
+
+        def getvalue(self):
+            return self._data
+
+    def file_uploader(*args, **kwargs):
+        data = st.session_state.get("_bench_resume")
+        if data is not None:
+            return _Upload(data)
+        return original(*args, **kwargs)
+
+    st.file_uploader = file_uploader
+
+
+def run_session(app_path, path, turns, timeout, latencies, errors):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(app_path, default_timeout=timeout)
+    at.session_state.intro_shown = True
+    if path == "resume":
+        at.session_state["_bench_resume"] = make_resume(uuid.uuid4().hex)
+        started = time.perf_counter()
+        at.run()
+        latencies.append(time.perf_counter() - started)
+        if at.exception or not len(at.session_state.history):
+            errors.append(path)
+        return
+
+    at.run()
+    for turn in range(turns):
+        question = QUESTIONS[path][turn % len(QUESTIONS[path])]
+        started = time.perf_counter()
+        at.chat_input[0].set_value(question).run()
+        latencies.append(time.perf_counter() - started)
+        if at.exception:
+            errors.append(path)
+
+
+def _worker(app_path, path, sessions, turns, timeout, llm_profile, barrier, results):
+    """Run `sessions` sessions in this process and report their latencies.
+
+    AppTest keeps per-process global runtime state, so concurrent sessions
+    each get their own process. Workers warm up (imports, first render) and
+    then start together on `barrier`.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    install_fake_gemini(llm_profile)
+    install_fake_uploader()
+    warm = AppTest.from_file(app_path, default_timeout=timeout)
+    warm.session_state.intro_shown = True
+    warm.run()
+
+    latencies, errors = [], []
+    barrier.wait()
+    started = time.time()
+    for _ in range(sessions):
+        try:
+            run_session(app_path, path, turns, timeout, latencies, errors)
+        except Exception as e:  # a crashed session counts as failed turns
+            errors.extend([f"{path}: {e}"] * turns)
+    results.put({
+        "latencies": latencies,
+        "errors": errors,
+        "started": started,
+        "finished": time.time(),
+        "gemini_calls": FakeGenerativeModel.calls,
+    })
+
+
+def run_level(app_path, path, concurrency, turns, timeout, llm_profile):
+    # Resume sessions do one measured turn each, so run `turns` sessions per worker
+    sessions = turns if path == "resume" else 1
+    session_turns = 1 if path == "resume" else turns
+
+    ctx = multiprocessing.get_context("spawn")
+    barrier, results = ctx.Barrier(concurrency), ctx.Queue()
+    workers = [
+        ctx.Process(
+            target=_worker,
+            args=(app_path, path, sessions, session_turns, timeout, llm_profile, barrier, results),
+        )
+        for _ in range(concurrency)
+    ]
+    for worker in workers:
+        worker.start()
+    reports = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    latencies = [value for report in reports for value in report["latencies"]]
+    errors = [error for report in reports for error in report["errors"]]
+    wall = max(r["finished"] for r in reports) - min(r["started"] for r in reports)
+    ms = [value * 1000 for value in latencies]
+    return {
+        "path": path,
+        "concurrency": concurrency,
+        "turns": len(latencies),
+        "errors": len(errors),
+        "p50_ms": percentile(ms, 50),
+        "p95_ms": percentile(ms, 95),
+        "p99_ms": percentile(ms, 99),
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+        "gemini_calls": sum(r["gemini_calls"] for r in reports),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return descriptions of every path/concurrency whose p95 exceeds baseline * tolerance."""
+    expected = {(row["path"], row["concurrency"]): row for row in baseline["results"]}
+    regressions = []
+    for row in results:
+        base = expected.get((row["path"], row["concurrency"]))
+        if base and base["p95_ms"] and row["p95_ms"] > base["p95_ms"] * tolerance:
+            regressions.append(
+                f"{row['path']} @ {row['concurrency']}: p95 {row['p95_ms']:.0f} ms "
+                f"vs baseline {base['p95_ms']:.0f} ms"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default=os.path.join(ROOT, "app.py"))
+    parser.add_argument("--paths", default=",".join(PATHS), help="comma-separated subset of %s" % ", ".join(PATHS))
+    parser.add_argument("--concurrency", default="1,2,4,8", help="comma-separated concurrent session counts")
+    parser.add_argument("--turns", type=int, default=5, help="measured turns per session (resume: sessions per worker)")
+    parser.add_argument("--llm", default="300,50,0", help="Gemini latency_ms,jitter_ms,failure_rate")
+    parser.add_argument("--jsearch", default="250,80,0", help="JSearch latency_ms,jitter_ms,failure_rate")
+    parser.add_argument("--adzuna", default="150,50,0", help="Adzuna latency_ms,jitter_ms,failure_rate")
+    parser.add_argument("--udemy", default="200,60,0", help="Udemy latency_ms,jitter_ms,failure_rate")
+    parser.add_argument("--with-caches", action="store_true", help="keep the market-data and semantic caches and the catalog on")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds allowed per AppTest run")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--save-baseline", help="write results as a baseline for later --baseline runs")
+    parser.add_argument("--baseline", help="compare p95 latencies against this baseline file")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="allowed p95 ratio over the baseline")
+    args = parser.parse_args()
+
+    server = FakeMarketServer({
+        "jsearch": Profile.parse(args.jsearch),
+        "adzuna": Profile.parse(args.adzuna),
+        "udemy": Profile.parse(args.udemy),
+    }).start()
+    scratch = tempfile.mkdtemp(prefix="oracle-bench-")
+    os.environ.update(server.urls())
+    os.environ.update({
+        "SKILL_INDEX_DIR": os.path.join(scratch, "skill_index"),
+        "MARKET_CACHE_PATH": os.path.join(scratch, "market_data.sqlite3"),
+        "CHAT_HISTORY_PATH": os.path.join(scratch, "chat_history.sqlite3"),
+        "CATALOG_PATH": os.path.join(scratch, "catalog.sqlite3"),
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+    })
+    if not args.with_caches:
+        os.environ.update({"MARKET_CACHE_ENABLED": "0", "SEMANTIC_CACHE_ENABLED": "0", "CATALOG_ENABLED": "0"})
+    os.environ.pop("RESUME_CACHE_DIR", None)
+
+    paths = [p for p in args.paths.split(",") if p]
+    levels = [int(c) for c in args.concurrency.split(",") if c]
+    results = []
+    print(f"{'path':<10}{'sessions':>9}{'turns':>7}{'errors':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'turns/s':>9}")
+    for path in paths:
+        for concurrency in levels:
+            row = run_level(args.app, path, concurrency, args.turns, args.timeout, Profile.parse(args.llm))
+            results.append(row)
+            print(
+                f"{path:<10}{concurrency:>9}{row['turns']:>7}{row['errors']:>7}"
+                f"{row['p50_ms'] or 0:>9.0f}{row['p95_ms'] or 0:>9.0f}{row['p99_ms'] or 0:>9.0f}"
+                f"{row['throughput_rps']:>9.2f}"
+            )
+    server.stop()
+
+    report = {
+        "config": {k: v for k, v in vars(args).items() if k not in ("json", "save_baseline", "baseline")},
+        "api_requests": server.requests,
+        "results": results,
+    }
+    for target in (args.json, args.save_baseline):
+        if target:
+            with open(target, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+
+    failed = any(row["errors"] for row in results)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        failed = failed or bool(regressions)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
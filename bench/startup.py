@@ -0,0 +1,79 @@
+"""Measure cold start and per-rerun overhead of app.py without network access.
+
+No chat input is sent, so no API is called and the numbers reflect the app's
+own import and setup cost. Usage:
+
+    python bench/startup.py [path/to/app.py] [--reruns N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+_CHILD = r"""
+import json, os, sys, time
+started = time.perf_counter()
+HEAVY = ("google.generativeai", "faiss", "PyPDF2", "docx")
+
+from streamlit.testing.v1 import AppTest
+
+app_path, reruns = sys.argv[1], int(sys.argv[2])
+sys.path.insert(0, os.path.dirname(os.path.abspath(app_path)))
+at = AppTest.from_file(app_path, default_timeout=60)
+at.run()
+cold = time.perf_counter() - started
+heavy_intro = [m for m in HEAVY if m in sys.modules]
+
+intro = []
+for _ in range(reruns):
+    t = time.perf_counter()
+    at.run()
+    intro.append(time.perf_counter() - t)
+
+at.session_state.intro_shown = True
+t = time.perf_counter()
+at.run()
+first_main = time.perf_counter() - t
+
+main = []
+for _ in range(reruns):
+    t = time.perf_counter()
+    at.run()
+    main.append(time.perf_counter() - t)
+
+heavy_main = [m for m in HEAVY if m in sys.modules]
+print(json.dumps({
+    "cold": cold, "intro": intro, "first_main": first_main, "main": main,
+    "heavy_intro": heavy_intro, "heavy_main": heavy_main,
+}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("app", nargs="?", default=os.path.join(os.path.dirname(__file__), "..", "app.py"))
+    parser.add_argument("--reruns", type=int, default=20)
+    args = parser.parse_args()
+
+    env = dict(os.environ, MARKET_CACHE_ENABLED="0", PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run(
+        [sys.executable, "-c", _CHILD, os.path.abspath(args.app), str(args.reruns)],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    data = json.loads(result.stdout.strip().splitlines()[-1])
+
+    def ms(values):
+        return f"{statistics.median(values) * 1000:.1f} ms"
+
+    print(f"cold start (imports + first intro render): {data['cold'] * 1000:.0f} ms")
+    print(f"intro rerun (median):                      {ms(data['intro'])}")
+    print(f"first main_app render:                     {data['first_main'] * 1000:.1f} ms")
+    print(f"main_app rerun (median):                   {ms(data['main'])}")
+    print(f"heavy modules loaded by the intro page:    {', '.join(data['heavy_intro']) or 'none'}")
+    print(f"heavy modules loaded by main_app:          {', '.join(data['heavy_main']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,582 @@
+"""Local catalog of job postings and courses, searched before the live APIs.
+
+Items come from imported dumps, periodic bulk pulls and (unless disabled)
+the live lookups themselves. They are stored in one SQLite file shared by
+every process on the host, with their search terms and embedding computed
+when written. Each process keeps an inverted index of the terms and a FAISS
+index of the embeddings in memory, loaded in the background at startup and
+brought up to date incrementally, so serving never waits on a refresh:
+
+    python catalog.py import jobs postings.jsonl
+    python catalog.py import courses courses.json
+    python catalog.py pull --skills-file top_skills.txt
+    python catalog.py prune
+    python catalog.py stats
+
+Dumps are JSON arrays or JSON lines of JSearch postings or Udemy courses.
+"""
+import argparse
+import heapq
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from dotenv import load_dotenv
+
+import tracing
+from embeddings import DIMENSION, embed_texts, tokenize
+from market_cache import DEFAULT_TTLS, normalize_skill
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("CATALOG_ENABLED", "1") == "1"
+CATALOG_PATH = os.getenv("CATALOG_PATH", os.path.join(".cache", "catalog.sqlite3"))
+# Store what live lookups return, so repeated and similar queries are answered locally
+LEARN = os.getenv("CATALOG_LEARN", "1") == "1"
+# Seconds between checks for items written by other processes or bulk pulls
+REFRESH_INTERVAL = float(os.getenv("CATALOG_REFRESH_INTERVAL", "60"))
+# Items older than this (seconds) are not served and are pruned. Items learned
+# from live lookups are kept no longer than the market-data cache would keep them.
+MAX_AGES = {
+    "jobs": int(os.getenv("CATALOG_MAX_AGE_JOBS", str(3 * 24 * 3600))),
+    "courses": int(os.getenv("CATALOG_MAX_AGE_COURSES", str(30 * 24 * 3600))),
+}
+# Fewer exact keyword matches than this and the live API is asked first
+MIN_RESULTS = {
+    "jobs": int(os.getenv("CATALOG_MIN_JOBS", "5")),
+    "courses": int(os.getenv("CATALOG_MIN_COURSES", "3")),
+}
+# Cosine similarity between query and item title needed for a fuzzy match, and
+# between an unknown query word and a title word it is read as (e.g. "kubernets")
+MIN_SIMILARITY = float(os.getenv("CATALOG_MIN_SIMILARITY", "0.5"))
+MIN_TERM_SIMILARITY = float(os.getenv("CATALOG_MIN_TERM_SIMILARITY", "0.6"))
+MEMO_SIZE = int(os.getenv("CATALOG_MEMO_SIZE", "2048"))
+KINDS = tuple(MAX_AGES)
+LOAD_BATCH = 5000
+
+_TITLE_FIELDS = {"jobs": "job_title", "courses": "title"}
+
+
+def _terms(text):
+    return {token.rstrip(".") for token in tokenize(text)} - {""}
+
+
+def _as_list(value):
+    if not value:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+
+def item_key(kind, item):
+    """The identity of an item: a newer copy with the same key replaces the stored one."""
+    if kind == "jobs":
+        return str(item.get("job_id") or f"{item.get('job_title')}|{item.get('employer_name')}")
+    return str(item.get("url") or item.get("title"))
+
+
+def item_title(kind, item):
+    """Title plus, for postings, the required skills: what fuzzy matches compare against."""
+    title = str(item.get(_TITLE_FIELDS[kind]) or "")
+    if kind == "jobs":
+        title = " ".join([title, *map(str, _as_list(item.get("job_required_skills")))])
+    return title
+
+
+def item_text(kind, item):
+    """Everything the keyword index covers."""
+    if kind == "jobs":
+        extra = [item.get("employer_name"), item.get("job_description")]
+    else:
+        extra = [item.get("headline"), item.get("category"), item.get("description")]
+    return " ".join([item_title(kind, item), *(str(part) for part in extra if part)])
+
+
+class _KindIndex:
+    """In-memory search structures for one kind of item."""
+
+    def __init__(self, faiss):
+        self.postings = {}
+        self.title_postings = {}
+        self.updated = {}
+        self.expires = {}
+        self.keys = {}
+        self.dead = 0
+        self.vectors = faiss.IndexIDMap2(faiss.IndexFlatIP(DIMENSION))
+        # Every title word seen, for reading misspelled or variant query words
+        self.terms = []
+        self.known_terms = set()
+        self.term_vectors = faiss.IndexFlatIP(DIMENSION)
+
+    def add_terms(self, terms):
+        terms = sorted(set(terms) - self.known_terms)
+        if terms:
+            self.terms.extend(terms)
+            self.known_terms.update(terms)
+            self.term_vectors.add(embed_texts(terms))
+
+    def closest_term(self, term):
+        if not self.terms:
+            return None
+        scores, found = self.term_vectors.search(embed_texts([term]), 1)
+        return self.terms[found[0][0]] if scores[0][0] >= MIN_TERM_SIMILARITY else None
+
+    def compact(self):
+        """Drop replaced items from the postings once they outnumber the live ones."""
+        for postings in (self.postings, self.title_postings):
+            for term in list(postings):
+                postings[term] &= self.updated.keys()
+                if not postings[term]:
+                    del postings[term]
+        self.dead = 0
+
+
+class Catalog:
+    """Postings and courses in SQLite, searched through in-memory indexes.
+
+    `search` matches items containing every term of the query, titles first
+    and then newest first, and tops up with fuzzy matches: unknown query words
+    read as the closest title word, then the vector index. Results are
+    memoized until the indexes change. Until the first load finishes `search`
+    returns None, as it does for a kind with no items, so callers fall back
+    to the live APIs.
+    """
+
+    def __init__(self, path=CATALOG_PATH, max_ages=None, refresh_interval=REFRESH_INTERVAL):
+        self.path = path
+        self.max_ages = dict(MAX_AGES, **(max_ages or {}))
+        self.learned_max_ages = {kind: min(age, DEFAULT_TTLS[kind]) for kind, age in self.max_ages.items()}
+        self.refresh_interval = refresh_interval
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS catalog_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                terms TEXT NOT NULL,
+                title_terms TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                updated_at REAL NOT NULL,
+                learned INTEGER NOT NULL DEFAULT 0,
+                UNIQUE (kind, key)
+            )
+            """
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(catalog_items)")}
+        if "learned" not in columns:
+            conn.execute("ALTER TABLE catalog_items ADD COLUMN learned INTEGER NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS catalog_items_age ON catalog_items (kind, updated_at)")
+
+        self._lock = threading.Lock()
+        self._kinds = {}
+        self._max_id = 0
+        self._generation = 0
+        self._memo = OrderedDict()
+        self._stats = {"hits": 0, "fuzzy_hits": 0, "misses": 0, "memo_hits": 0}
+        self._ready = threading.Event()
+        self._wake = threading.Event()
+        self._closed = False
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="catalog-write")
+        self._thread = threading.Thread(target=self._run, name="catalog-refresh", daemon=True)
+
+    def start(self):
+        """Load the indexes in the background, then keep them up to date."""
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # -- writing --------------------------------------------------------------
+
+    def add(self, kind, items, updated_at=None, learned=False):
+        """Store `items` of `kind` ("jobs" or "courses"), replacing older copies. Returns how many changed.
+
+        `learned` marks items taken from a live lookup, which expire with the
+        market-data cache; an item also stored by an import or pull keeps the
+        longer lifetime.
+        """
+        updated_at = time.time() if updated_at is None else updated_at
+        latest = {}
+        for item in items:
+            if isinstance(item, dict) and item_key(kind, item) not in ("None", ""):
+                latest[item_key(kind, item)] = json.dumps(item, sort_keys=True)
+        if not latest:
+            return 0
+
+        conn = self._connect()
+        keys = list(latest)
+        stored = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            for key, *row in conn.execute(
+                f"SELECT key, value, terms, title_terms, vector, learned FROM catalog_items WHERE kind = ? AND key IN ({','.join('?' * len(chunk))})",
+                [kind, *chunk],
+            ):
+                stored[key] = row
+
+        changed = [key for key in keys if key not in stored or stored[key][0] != latest[key]]
+        encoded = {}
+        if changed:
+            items = {key: json.loads(latest[key]) for key in changed}
+            vectors = embed_texts([item_title(kind, item) for item in items.values()])
+            for (key, item), vector in zip(items.items(), vectors):
+                encoded[key] = (
+                    " ".join(_terms(item_text(kind, item))), " ".join(_terms(item_title(kind, item))),
+                    vector.astype(np.float32).tobytes(),
+                )
+        rows = []
+        for key, value in latest.items():
+            terms, title_terms, vector = encoded[key] if key in encoded else stored[key][1:4]
+            was_learned = stored[key][4] if key in stored else True
+            rows.append((kind, key, value, terms, title_terms, vector, updated_at, int(learned and was_learned)))
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Every write gets a new id, which is how refreshes notice new and renewed items
+            conn.executemany(
+                "INSERT OR REPLACE INTO catalog_items (kind, key, value, terms, title_terms, vector, updated_at, learned) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(changed)
+
+    def learn(self, kind, items):
+        """Store live lookup results on the writer thread, off the request path.
+
+        They are searchable after the next refresh, so the memoized results
+        are not invalidated by every live lookup.
+        """
+        if kind not in KINDS or not items:
+            return
+
+        def write():
+            try:
+                self.add(kind, items, learned=True)
+            except sqlite3.Error as e:
+                logger.warning("Could not store %s in the catalog: %s", kind, e)
+
+        self._writer.submit(write)
+
+    def prune(self):
+        """Delete items past their kind's maximum age. Returns how many were deleted."""
+        now = time.time()
+        conn = self._connect()
+        deleted = 0
+        for kind, max_age in self.max_ages.items():
+            deleted += conn.execute(
+                "DELETE FROM catalog_items WHERE kind = ? AND (updated_at < ? OR (learned AND updated_at < ?))",
+                (kind, now - max_age, now - self.learned_max_ages[kind]),
+            ).rowcount
+        return deleted
+
+    # -- loading --------------------------------------------------------------
+
+    def _run(self):
+        while not self._closed:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning("Catalog refresh failed: %s", e)
+            self._ready.set()
+            self._wake.wait(self.refresh_interval)
+            self._wake.clear()
+
+    def refresh(self):
+        """Index rows written since the last refresh; returns how many were applied.
+
+        Rows are read and decoded without the lock, which is held only while
+        each batch is merged into the in-memory indexes.
+        """
+        with tracing.span("catalog.refresh") as span:
+            applied = 0
+            conn = self._connect()
+            while True:
+                rows = conn.execute(
+                    "SELECT id, kind, key, terms, title_terms, vector, updated_at, learned FROM catalog_items WHERE id > ? ORDER BY id LIMIT ?",
+                    (self._max_id, LOAD_BATCH),
+                ).fetchall()
+                if not rows:
+                    break
+                self._apply(rows)
+                applied += len(rows)
+            span.set(rows=applied)
+            return applied
+
+    def _kind(self, kind):
+        if kind not in self._kinds:
+            # Imported here: faiss is slow to import and the catalog loads in the background
+            import faiss
+            self._kinds[kind] = _KindIndex(faiss)
+        return self._kinds[kind]
+
+    def _apply(self, rows):
+        now = time.time()
+        batches = {}
+        for row_id, kind, key, terms, title_terms, vector, updated_at, learned in rows:
+            if kind not in self.max_ages:
+                continue
+            expires = updated_at + (self.learned_max_ages if learned else self.max_ages)[kind]
+            if expires > now:
+                batches.setdefault(kind, []).append(
+                    (row_id, key, terms.split(), title_terms.split(), np.frombuffer(vector, dtype=np.float32), updated_at, expires)
+                )
+        with self._lock:
+            for kind, batch in batches.items():
+                index = self._kind(kind)
+                replaced = [index.keys[key] for _, key, *_ in batch if key in index.keys]
+                if replaced:
+                    index.vectors.remove_ids(np.asarray(replaced, dtype=np.int64))
+                    for old_id in replaced:
+                        index.updated.pop(old_id, None)
+                        index.expires.pop(old_id, None)
+                    index.dead += len(replaced)
+                for row_id, key, terms, title_terms, _, updated_at, expires in batch:
+                    index.keys[key] = row_id
+                    index.updated[row_id] = updated_at
+                    index.expires[row_id] = expires
+                    for term in terms:
+                        index.postings.setdefault(term, set()).add(row_id)
+                    for term in title_terms:
+                        index.title_postings.setdefault(term, set()).add(row_id)
+                index.add_terms(term for _, _, _, title_terms, *_ in batch for term in title_terms)
+                index.vectors.add_with_ids(
+                    np.stack([vector for *_, vector, _, _ in batch]),
+                    np.asarray([row_id for row_id, *_ in batch], dtype=np.int64),
+                )
+                if index.dead > len(index.updated):
+                    index.compact()
+            self._max_id = max(self._max_id, rows[-1][0])
+            if batches:
+                self._generation += 1
+                for memo_key in [key for key in self._memo if key[0] in batches]:
+                    del self._memo[memo_key]
+
+    # -- searching ------------------------------------------------------------
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def search(self, kind, query, limit):
+        """`(items, exact)`: up to `limit` stored items of `kind` for `query`, or None when the catalog cannot answer yet.
+
+        The first `exact` items contain every word of the query; the rest are
+        fuzzy matches, good for filling out a list or for when the live API is
+        unavailable, but not proof that the catalog covers the query.
+        """
+        if not self._ready.is_set():
+            return None
+        memo_key = (kind, normalize_skill(query), limit)
+        with self._lock:
+            index = self._kinds.get(kind)
+            if index is None or not index.updated:
+                return None
+            if memo_key in self._memo:
+                self._memo.move_to_end(memo_key)
+                self._stats["memo_hits"] += 1
+                items, exact = self._memo[memo_key]
+                return list(items), exact
+            generation = self._generation
+            ids, exact = self._match(index, query, limit)
+
+        items = self._fetch(ids)
+        exact = min(exact, len(items))
+        with self._lock:
+            self._stats["hits" if exact else "fuzzy_hits" if items else "misses"] += 1
+            if generation == self._generation:
+                self._memo[memo_key] = (items, exact)
+                while len(self._memo) > MEMO_SIZE:
+                    self._memo.popitem(last=False)
+        return list(items), exact
+
+    @staticmethod
+    def _keyword_matches(index, postings, terms, limit, now):
+        """Ids of unexpired items whose `postings` entries cover every one of `terms`, newest first."""
+        sets = sorted((postings.get(term, set()) for term in terms), key=len)
+        matches = set.intersection(*sets) if sets[0] else set()
+        return heapq.nsmallest(
+            limit,
+            (i for i in matches if index.expires.get(i, 0) > now),
+            key=lambda i: -index.updated[i],
+        )
+
+    def _match(self, index, query, limit):
+        """`(ids, exact)` for `query`, exact matches first; called with the lock held.
+
+        Only items whose title or required skills contain every query word are
+        exact. Items naming them anywhere else (e.g. "Java is a plus" in a
+        Python posting's description), spelling-corrected and similar items
+        only fill out the list.
+        """
+        now = time.time()
+        terms = _terms(query)
+        ids = self._keyword_matches(index, index.title_postings, terms, limit, now) if terms else []
+        exact = len(ids)
+        chosen = set(ids)
+
+        def top_up(candidates):
+            for i in candidates:
+                if len(ids) >= limit:
+                    return
+                if i not in chosen and index.expires.get(i, 0) > now:
+                    ids.append(i)
+                    chosen.add(i)
+
+        # Then the query words anywhere in the item, then with unknown words read as known ones
+        if len(ids) < limit and terms:
+            top_up(self._keyword_matches(index, index.postings, terms, limit + len(ids), now))
+        corrected = {term if term in index.postings else index.closest_term(term) or term for term in terms}
+        if corrected != terms:
+            for postings in (index.title_postings, index.postings):
+                if len(ids) < limit:
+                    top_up(self._keyword_matches(index, postings, corrected, limit + len(ids), now))
+        if len(ids) < limit and index.vectors.ntotal:
+            query_vector = embed_texts([query]).astype(np.float32)
+            scores, found = index.vectors.search(query_vector, min(index.vectors.ntotal, limit * 2 + len(ids)))
+            top_up(int(i) for score, i in zip(scores[0], found[0]) if i >= 0 and score >= MIN_SIMILARITY)
+        return ids, exact
+
+    def _fetch(self, ids):
+        if not ids:
+            return []
+        rows = self._connect().execute(
+            f"SELECT id, value FROM catalog_items WHERE id IN ({','.join('?' * len(ids))})", ids
+        ).fetchall()
+        values = dict(rows)
+        return [json.loads(values[i]) for i in ids if i in values]
+
+    def stats(self):
+        """Indexed items per kind plus search hit (exact or only fuzzy), miss and memo-hit counts for this process."""
+        with self._lock:
+            counts = {kind: len(index.updated) for kind, index in self._kinds.items()}
+            return dict(self._stats, items=counts, ready=self._ready.is_set())
+
+    def counts(self):
+        """Stored items per kind, straight from the database."""
+        return dict(self._connect().execute("SELECT kind, COUNT(*) FROM catalog_items GROUP BY kind").fetchall())
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+_catalog_failed = False
+
+
+def get_catalog():
+    """Return the process-wide catalog, starting its background load on first use; None if disabled or unavailable."""
+    global _catalog, _catalog_failed
+    if _catalog is None and ENABLED and not _catalog_failed:
+        with _catalog_lock:
+            if _catalog is None and not _catalog_failed:
+                try:
+                    _catalog = Catalog().start()
+                except (sqlite3.Error, OSError) as e:
+                    logger.warning("Job and course catalog disabled: %s", e)
+                    _catalog_failed = True
+    return _catalog
+
+
+# -- command line -------------------------------------------------------------
+
+
+def read_dump(path):
+    """Items from a JSON array (or an object with a "data" or "courses" list) or a JSON-lines file."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(data, dict):
+        data = data.get("data") or data.get("courses") or []
+    return data if isinstance(data, list) else [data]
+
+
+def _prepare(kind, items):
+    if kind != "jobs":
+        return items
+    # Imported here: market_data imports this module
+    import market_data
+    return [market_data._slim_job(item) for item in items]
+
+
+def pull(catalog, skills, workers=4):
+    """Fetch live postings and courses for each skill into the catalog. Returns items changed per kind."""
+    import market_data
+    fetchers = {"jobs": market_data._fetch_job_postings, "courses": market_data._fetch_free_courses}
+    changed = dict.fromkeys(fetchers, 0)
+
+    def pull_one(skill):
+        for kind, fetch in fetchers.items():
+            try:
+                changed[kind] += catalog.add(kind, fetch(skill))
+            except Exception as e:
+                logger.warning("Could not pull %s for %s: %s", kind, skill, e)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(pull_one, skills))
+    return changed
+
+
+def main():
+    load_dotenv()
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="Build and maintain the local job and course catalog")
+    commands = parser.add_subparsers(dest="command", required=True)
+    imports = commands.add_parser("import", help="add postings or courses from JSON or JSON-lines dumps")
+    imports.add_argument("kind", choices=KINDS)
+    imports.add_argument("paths", nargs="+")
+    pulls = commands.add_parser("pull", help="fetch live postings and courses for a list of skills")
+    pulls.add_argument("--skills", default="", help="comma-separated skills")
+    pulls.add_argument("--skills-file", help="file with one skill per line")
+    pulls.add_argument("--workers", type=int, default=4, help="skills pulled at once")
+    commands.add_parser("prune", help="delete items past their maximum age")
+    commands.add_parser("stats", help="print stored items per kind")
+    args = parser.parse_args()
+
+    catalog = Catalog()
+    if args.command == "import":
+        changed = 0
+        for path in args.paths:
+            changed += catalog.add(args.kind, _prepare(args.kind, read_dump(path)))
+        print(json.dumps({args.kind: changed}))
+    elif args.command == "pull":
+        skills = [s.strip() for s in args.skills.split(",") if s.strip()]
+        if args.skills_file:
+            with open(args.skills_file, encoding="utf-8") as f:
+                skills += [line.strip() for line in f if line.strip()]
+        if not skills:
+            parser.error("give --skills or --skills-file")
+        print(json.dumps(pull(catalog, list(dict.fromkeys(skills)), args.workers)))
+    elif args.command == "prune":
+        print(json.dumps({"deleted": catalog.prune()}))
+    else:
+        print(json.dumps(catalog.counts()))
+
+
+if __name__ == "__main__":
+    main()
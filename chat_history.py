@@ -0,0 +1,230 @@
+import itertools
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+HISTORY_PATH = os.getenv("CHAT_HISTORY_PATH", os.path.join(".cache", "chat_history.sqlite3"))
+# Messages kept in memory per session; older ones are moved to disk
+WINDOW = int(os.getenv("CHAT_HISTORY_WINDOW", "20"))
+# Messages rendered at first, and how many more each "load earlier" adds
+PAGE_SIZE = int(os.getenv("CHAT_HISTORY_PAGE_SIZE", "10"))
+# Spilled messages are deleted this many seconds after they were written,
+# checked when the store opens and every PURGE_EVERY writes
+TTL = int(os.getenv("CHAT_HISTORY_TTL", str(7 * 24 * 3600)))
+PURGE_EVERY = 500
+# Token budgets for the rolling summary of spilled turns and for the whole LLM context
+SUMMARY_TOKENS = int(os.getenv("CHAT_SUMMARY_TOKENS", "300"))
+CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", "800"))
+SUMMARY_LINE_CHARS = 160
+CONTEXT_LINE_CHARS = 600
+
+_MARKUP_RE = re.compile(r"^#+\s*|[*_`>]+|\[([^\]]*)\]\([^)]*\)", re.MULTILINE)
+# Messages that lean on earlier turns: pronouns and phrases pointing back, or an
+# opening that continues the previous question. "IT" the field is not "it".
+_FOLLOW_UP_RE = re.compile(
+    r"\b(?:(?-i:[Ii]t)|its|that's|about that|this|these|those|they|them|their|one|ones|"
+    r"above|same|else|instead|more|mention(?:ed)?|earlier|previous|said|suggested)\b"
+    r"|\bthat\W*$|^\s*(?:and|but|so|also|then|why|how come|what about|how about)\b",
+    re.IGNORECASE,
+)
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token); no tokenizer is needed offline."""
+    return len(text) // 4 + 1
+
+
+def condense(message, max_chars):
+    """One plain-text line for a message, with markdown stripped and cut to `max_chars`."""
+    text = _MARKUP_RE.sub(lambda m: m.group(1) or "", message["content"])
+    text = re.sub(r"\s+", " ", text).strip()
+    if len(text) > max_chars:
+        text = text[:max_chars - 1].rstrip() + "…"
+    speaker = "User" if message["role"] == "user" else "Oracle"
+    return f"{speaker}: {text}"
+
+
+def is_follow_up(message):
+    """Whether a message refers back to the conversation, e.g. "Which of those pays best?".
+
+    Standalone questions get no context, so their answers can be cached and shared.
+    """
+    return bool(_FOLLOW_UP_RE.search(message))
+
+
+class HistoryStore:
+    """Spilled chat messages of every session, zlib-compressed in one SQLite file.
+
+    Like the market-data cache, every process on the host shares the file and
+    each thread keeps its own connection. Rows older than `ttl` are purged when
+    the store is opened and every `PURGE_EVERY` writes.
+    """
+
+    def __init__(self, path=HISTORY_PATH, ttl=TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._writes = itertools.count(1)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chat_messages (
+                session TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                role TEXT NOT NULL,
+                content BLOB NOT NULL,
+                stored_at REAL NOT NULL,
+                PRIMARY KEY (session, seq)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS chat_messages_age ON chat_messages (stored_at)")
+        self.purge()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def write(self, session, seq, message):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO chat_messages (session, seq, role, content, stored_at) VALUES (?, ?, ?, ?, ?)",
+            (session, seq, message["role"], zlib.compress(message["content"].encode("utf-8")), time.time()),
+        )
+        # Long-running processes would otherwise keep every message until restarted
+        if next(self._writes) % PURGE_EVERY == 0:
+            self.purge()
+
+    def purge(self):
+        """Delete messages older than the TTL."""
+        self._connect().execute("DELETE FROM chat_messages WHERE stored_at < ?", (time.time() - self.ttl,))
+
+    def read(self, session, start, end):
+        """Messages `start` to `end` (exclusive) of a session, oldest first; purged ones are skipped."""
+        rows = self._connect().execute(
+            "SELECT role, content FROM chat_messages WHERE session = ? AND seq >= ? AND seq < ? ORDER BY seq",
+            (session, start, end),
+        ).fetchall()
+        return [{"role": role, "content": zlib.decompress(content).decode("utf-8")} for role, content in rows]
+
+    def delete(self, session):
+        self._connect().execute("DELETE FROM chat_messages WHERE session = ?", (session,))
+
+
+_store = None
+_store_lock = threading.Lock()
+_store_failed = False
+
+
+def get_store():
+    """Return the shared on-disk store, or None if it cannot be opened."""
+    global _store, _store_failed
+    if _store is None and not _store_failed:
+        with _store_lock:
+            if _store is None and not _store_failed:
+                try:
+                    _store = HistoryStore()
+                except (sqlite3.Error, OSError) as e:
+                    logger.warning("Chat history store disabled; older messages will be dropped: %s", e)
+                    _store_failed = True
+    return _store
+
+
+class ChatHistory:
+    """One session's messages with bounded memory.
+
+    The latest `window` messages stay in memory; older ones are written to
+    the shared `HistoryStore` and folded into a rolling summary of at most
+    `summary_tokens`, which drops its oldest lines as new ones arrive. Without
+    a store, spilled messages are only summarized.
+    """
+
+    def __init__(self, store=None, window=WINDOW, summary_tokens=SUMMARY_TOKENS):
+        self.session_id = uuid.uuid4().hex
+        self.window = max(1, window)
+        self.summary_tokens = summary_tokens
+        self._store = store if store is not None else get_store()
+        self._recent = deque()
+        self._spilled = 0
+        self._summary = deque()
+        self._summary_size = 0
+
+    def __len__(self):
+        return self._spilled + len(self._recent)
+
+    def append(self, role, content):
+        self._recent.append({"role": role, "content": content})
+        while len(self._recent) > self.window:
+            self._spill(self._recent.popleft())
+
+    def _spill(self, message):
+        if self._store is not None:
+            try:
+                self._store.write(self.session_id, self._spilled, message)
+            except sqlite3.Error as e:
+                logger.warning("Could not write chat history: %s", e)
+        self._spilled += 1
+
+        line = condense(message, SUMMARY_LINE_CHARS)
+        self._summary.append(line)
+        self._summary_size += estimate_tokens(line)
+        while self._summary and self._summary_size > self.summary_tokens:
+            self._summary_size -= estimate_tokens(self._summary.popleft())
+
+    def last(self, count):
+        """The latest `count` messages, oldest first, reading spilled ones back from disk."""
+        start = max(0, len(self) - count)
+        recent = list(self._recent)
+        if start >= self._spilled:
+            return recent[start - self._spilled:]
+        older = []
+        if self._store is not None:
+            try:
+                older = self._store.read(self.session_id, start, self._spilled)
+            except sqlite3.Error as e:
+                logger.warning("Could not read chat history: %s", e)
+        return older + recent
+
+    def summary(self):
+        return "\n".join(self._summary)
+
+    def context(self, max_tokens=CONTEXT_TOKENS):
+        """The conversation so far for a prompt: the rolling summary, then as many recent messages as fit."""
+        lines, used = [], self._summary_size
+        for message in reversed(self._recent):
+            line = condense(message, CONTEXT_LINE_CHARS)
+            used += estimate_tokens(line)
+            if used > max_tokens:
+                break
+            lines.append(line)
+        return "\n".join(list(self._summary) + lines[::-1])
+
+    def context_for(self, message, max_tokens=CONTEXT_TOKENS):
+        """`context()` if `message` follows on from earlier turns (see `is_follow_up`), else ""."""
+        return self.context(max_tokens) if len(self) and is_follow_up(message) else ""
+
+    def clear(self):
+        if self._store is not None:
+            try:
+                self._store.delete(self.session_id)
+            except sqlite3.Error as e:
+                logger.warning("Could not delete chat history: %s", e)
+        self._recent.clear()
+        self._spilled = 0
+        self._summary.clear()
+        self._summary_size = 0
@@ -0,0 +1,130 @@
+import re
+import threading
+
+import numpy as np
+
+# Hashing vectorizer over words and character n-grams. It needs no model download
+# or network access, and the same text always maps to the same vector.
+DIMENSION = 256
+NGRAM_SIZES = (3, 4, 5)
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+
+# Token vectors already computed, oldest first
+CACHE_SIZE = 1 << 15
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _crc_table():
+    table = np.arange(256, dtype=np.uint32)
+    for _ in range(8):
+        table = np.where(table & 1, (table >> 1) ^ np.uint32(0xEDB88320), table >> 1)
+    return table
+
+
+_CRC_TABLE = _crc_table()
+
+
+def _crc32(codes, lengths):
+    """`zlib.crc32` of each row of the uint8 matrix `codes`, over its first `lengths` bytes."""
+    crc = np.full(len(codes), 0xFFFFFFFF, dtype=np.uint32)
+    for i in range(codes.shape[1]):
+        step = _CRC_TABLE[(crc ^ codes[:, i]) & 0xFF] ^ (crc >> 8)
+        crc = np.where(i < lengths, step, crc)
+    return crc ^ np.uint32(0xFFFFFFFF)
+
+
+def _byte_matrix(strings, width):
+    """ASCII `strings` as a zero-padded (n, width) uint8 matrix."""
+    data = np.frombuffer("".join(s.ljust(width, "\0") for s in strings).encode("ascii"), dtype=np.uint8)
+    return data.reshape(len(strings), width)
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+def _compute_token_vectors(tokens):
+    """The summed feature vectors of `tokens`: each word itself and its character n-grams.
+
+    All features of the batch are hashed at once; each is `zlib.crc32` of its
+    text, giving a bucket and, from the top bit, a sign.
+    """
+    lengths = np.fromiter(map(len, tokens), dtype=np.int64, count=len(tokens))
+    words = _byte_matrix(["w:" + token for token in tokens], int(lengths.max()) + 2)
+    hashes, owners = [_crc32(words, lengths + 2)], [np.arange(len(tokens))]
+    padded = _byte_matrix([f" {token} " for token in tokens], int(lengths.max()) + 2)
+    for n in NGRAM_SIZES:
+        windows = np.lib.stride_tricks.sliding_window_view(padded, n, axis=1)
+        # Window i of a token is an n-gram of it while it ends inside the padded token
+        valid = np.arange(windows.shape[1]) <= (lengths + 2 - n)[:, None]
+        hashes.append(_crc32(windows[valid], n))
+        owners.append(np.nonzero(valid)[0])
+    hashes, owners = np.concatenate(hashes), np.concatenate(owners)
+    signs = np.where(hashes >> 31, 1.0, -1.0)
+    flat = np.bincount(owners * DIMENSION + hashes % DIMENSION, weights=signs, minlength=len(tokens) * DIMENSION)
+    return flat.reshape(len(tokens), DIMENSION).astype(np.float32)
+
+
+def _token_vectors(tokens):
+    """A (len(tokens), DIMENSION) matrix of token vectors, computing only those not cached."""
+    with _cache_lock:
+        cached = [_cache.get(token) for token in tokens]
+    missing = list(dict.fromkeys(token for token, vector in zip(tokens, cached) if vector is None))
+    if missing:
+        vectors = _compute_token_vectors(missing)
+        vectors.flags.writeable = False
+        computed = dict(zip(missing, vectors))
+        with _cache_lock:
+            _cache.update(computed)
+            while len(_cache) > CACHE_SIZE:
+                del _cache[next(iter(_cache))]
+        cached = [computed[token] if vector is None else vector for token, vector in zip(tokens, cached)]
+    return np.stack(cached)
+
+
+def token_counts(texts):
+    """Count tokens per text: returns an (n, distinct tokens) float32 matrix and the `{token: column}` vocabulary."""
+    vocabulary, columns, lengths = {}, [], []
+    for text in texts:
+        ids = [vocabulary.setdefault(token.rstrip("."), len(vocabulary)) for token in tokenize(text)]
+        columns.extend(ids)
+        lengths.append(len(ids))
+    rows = np.repeat(np.arange(len(texts)), lengths)
+    flat = np.bincount(rows * len(vocabulary) + np.asarray(columns, dtype=np.int64), minlength=len(texts) * len(vocabulary))
+    return flat.reshape(len(texts), len(vocabulary)).astype(np.float32), vocabulary
+
+
+def embed_counts(counts, vocabulary):
+    """Embed texts given as `token_counts` output into unit vectors (one row per text)."""
+    if not vocabulary:
+        return np.zeros((counts.shape[0], DIMENSION), dtype=np.float32)
+    matrix = counts @ _token_vectors(list(vocabulary))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def embed_texts(texts):
+    """Embed a list of strings into an (n, DIMENSION) float32 matrix of unit vectors.
+
+    A text's vector is the sum of its tokens' vectors, so the batch is one
+    (texts x distinct tokens) count matrix times a table of token vectors.
+    """
+    return embed_counts(*token_counts(texts))
+
+
+def embed_text(text):
+    return embed_texts([text])[0]
+
+
+def embed_skills(skills):
+    """Embed a list of skills as one profile vector (the normalized mean of each skill)."""
+    skills = [s for s in skills if str(s).strip()]
+    if not skills:
+        return np.zeros(DIMENSION, dtype=np.float32)
+    vector = embed_texts(skills).mean(axis=0)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
@@ -0,0 +1,317 @@
+import logging
+
+import intent
+import job_ranking
+import llm
+import market_data
+import resume_parser
+import stages
+import tracing
+
+logger = logging.getLogger(__name__)
+
+# Bot persona information used in casual chat
+BOT_PERSONA = {
+    "name": "Career Path Oracle",
+    "personality": "helpful, friendly, and knowledgeable about careers",
+    "origin": "Created by a team of students (Pavan, Sakshi, and Kausar) as a project to help people find their ideal career paths",
+    "mission": "To help users explore career opportunities, analyze their skills, and find resources to enhance their professional growth",
+    "likes": "Helping people discover their passions and potential career paths",
+    "location": "Cloud-based and accessible from anywhere",
+    "hobbies": "Analyzing job markets, matching skills to careers, and finding learning resources"
+}
+
+
+def respond_to_casual_chat(user_input, timer=None, errors=None, context=None):
+    """Stream responses for casual chat questions about the bot, aware of the conversation so far"""
+    prompt = f"""{llm.context_block(context)}
+    You are the Career Path Oracle, an AI assistant specialized in career guidance.
+
+    About you:
+    - Name: {BOT_PERSONA['name']}
+    - Personality: {BOT_PERSONA['personality']}
+    - Origin: {BOT_PERSONA['origin']}
+    - Mission: {BOT_PERSONA['mission']}
+    - Likes: {BOT_PERSONA['likes']}
+    - Location: {BOT_PERSONA['location']}
+    - Hobbies: {BOT_PERSONA['hobbies']}
+
+    The user asks: "{user_input}"
+
+    Respond in a friendly, conversational way as the Career Path Oracle. Keep your response focused and under 100 words.
+    After answering their casual question, gently steer the conversation back to career guidance by adding a question
+    about their career interests or skills at the end.
+    """
+
+    fallback = "I'm the Career Path Oracle, here to help with your career questions! I encountered a small issue ({error}), but I'm still here to assist you. What career path are you interested in exploring today?"
+    return stream_reply(prompt, fallback, timer, errors)
+
+
+def stream_reply(prompt, fallback, timer=None, errors=None):
+    """
+    Yield the model's reply chunk by chunk; on failure yield `fallback` with the error filled in.
+    Failures are also appended to `errors` when given, so callers can tell a fallback from a reply.
+    """
+    try:
+        for text in llm.iter_text(llm.get_model(), prompt):
+            if timer is not None:
+                timer.first_token()
+            yield text
+    except Exception as e:
+        if timer is not None:
+            timer.first_token()
+        if errors is not None:
+            errors.append(e)
+        yield fallback.format(error=str(e))
+
+
+@tracing.traced("analyze_skills")
+def analyze_skills(user_input, on_text=None):
+    """Analyze skills as a bulleted list, reporting the text so far to `on_text` while it streams"""
+    prompt = f"""
+    Analyze the user's input: "{user_input}"
+    Identify their top 3 skills and suggest 3 career paths.
+    Format the response as a bulleted list.
+    """
+    analysis = ""
+    for text in stream_reply(prompt, "Error analyzing skills: {error}"):
+        analysis += text
+        if on_text is not None:
+            on_text(analysis)
+    return analysis
+
+
+@tracing.traced("classify_with_llm")
+def classify_with_llm(user_input):
+    """
+    Ask Gemini whether the user is having a casual chat or seeking career information
+    Returns: 
+    - "chat" for casual conversation about the bot
+    - "career" for career-related questions
+    - "greeting" for simple greetings
+    """
+    prompt = f"""
+    Analyze this message: "{user_input}"
+
+    Categorize it as ONE of the following:
+    1. "greeting" - if it's just a simple hello or introduction
+    2. "chat" - if the user is asking personal questions about the bot itself (like "who are you", "where are you from", "what's your name", etc.)
+    3. "career" - if the user is asking about careers, jobs, skills, resume advice, or other professional topics
+
+    Respond with ONLY "greeting", "chat", or "career".
+    """
+
+    try:
+        response = llm.get_model().generate_content(prompt)
+        result = response.text.strip().lower()
+        if result in ["greeting", "chat", "career"]:
+            return result
+        else:
+            # Default to career if classification fails
+            return "career"
+    except Exception as e:
+        # Default to career if there's an error
+        return "career"
+
+
+@tracing.traced("detect_message_type")
+def detect_message_type(user_input, structured_turn=None, context=None):
+    """
+    Classify locally, falling back to Gemini only for low-confidence messages.
+    In combined mode the fallback is the structured career-turn call, whose
+    result is stored in `structured_turn` so a career turn needs no further prompt.
+    """
+    fallback = classify_with_llm
+    if llm.COMBINED_MODE and structured_turn is not None:
+        def fallback(text):
+            structured_turn.update(llm.analyze_career_turn(llm.get_model(), text, context=context))
+            return structured_turn["intent"]
+    return intent.detect_message_type(user_input, fallback=fallback)
+
+
+class NotCareerQuestion(Exception):
+    """The structured call found that a message taken for a career question is a greeting or chat"""
+
+    def __init__(self, intent):
+        super().__init__(f"not a career question ({intent})")
+        self.intent = intent
+
+
+def _career_turn(turn):
+    """`turn` if it is a career analysis; raises `NotCareerQuestion` for any other intent"""
+    if turn["intent"] != "career":
+        raise NotCareerQuestion(turn["intent"])
+    return turn
+
+
+def _turn_stage(run):
+    """The combined structured call, or None when combined mode is off or fails and the separate prompts take over"""
+    if not llm.COMBINED_MODE:
+        return None
+    if run.inputs.get("structured_turn"):
+        return run.inputs["structured_turn"]
+
+    def on_partial(partial):
+        if partial.get("keyword"):
+            # Let the lookups start before the rest of the reply arrives
+            run.resolve("keyword", partial["keyword"])
+        if partial.get("skills") or partial.get("career_paths"):
+            run.publish("analysis", llm.format_analysis(partial))
+
+    try:
+        return run.inputs["structured_call"](on_partial)
+    except Exception as e:
+        logger.warning("Combined analysis failed, using separate prompts: %s", e)
+        return None
+
+
+def _keyword_stage(run, turn):
+    if turn:
+        return _career_turn(turn)["keyword"]
+    return llm.get_model().generate_content(run.inputs["skill_prompt"]).text.strip()
+
+
+def _analysis_stage(run, turn):
+    if turn:
+        return llm.format_analysis(_career_turn(turn))
+    return analyze_skills(run.inputs["analysis_input"], lambda text: run.publish("analysis", text))
+
+
+def _lookup_stage(key):
+    return lambda run, keyword: market_data.LOOKUPS[key](keyword)
+
+
+# One turn: the analysis and the search keyword are independent once the
+# optional combined call is done, and each lookup needs only the keyword.
+# Lookup stages return `(value, stale_age)`.
+LOOKUP_STAGES = tuple(market_data.LOOKUPS)
+TURN_GRAPH = stages.StageGraph([
+    stages.Stage("turn", _turn_stage, memoize=lambda turn: turn is not None),
+    stages.Stage("keyword", _keyword_stage, ("turn",), memoize=True),
+    stages.Stage("analysis", _analysis_stage, ("turn",), memoize=lambda text: not text.startswith("Error analyzing skills")),
+    *(stages.Stage(key, _lookup_stage(key), ("keyword",)) for key in LOOKUP_STAGES),
+])
+
+
+def _start_turn(kind, analysis_input, skill_prompt, structured_call, structured_turn=None, enrich=True, context=None):
+    inputs = {
+        "analysis_input": analysis_input,
+        "skill_prompt": skill_prompt,
+        "structured_call": structured_call,
+        "structured_turn": structured_turn,
+    }
+    targets = ("analysis", "keyword") + (LOOKUP_STAGES if enrich else ())
+    # Answers shaped by one conversation's history are not reused for anyone else
+    memo_key = None if context else (kind, llm.COMBINED_MODE, analysis_input)
+    return TURN_GRAPH.start(inputs, targets, memo_key=memo_key)
+
+
+def start_career_turn(user_input, structured_turn=None, enrich=True, context=None):
+    """
+    Start the analysis, search keyword and (with `enrich`) market lookups for a career question.
+    `context` summarizes the conversation so far; turns with a context are not memoized.
+    """
+    # Extract a key skill to search for jobs and courses
+    skill_prompt = f"Extract a single professional skill or job title from this text: '{user_input}'. Give only the skill or job title, nothing else."
+    return _start_turn(
+        "career", user_input, skill_prompt,
+        lambda on_partial: llm.analyze_career_turn(llm.get_model(), user_input, on_partial=on_partial, context=context),
+        structured_turn, enrich, context,
+    )
+
+
+def start_resume_turn(all_skills, enrich=True):
+    """Start the analysis, most relevant job title and (with `enrich`) market lookups for resume skills"""
+    # Extract a primary skill/job title from the resume
+    skill_prompt = f"Based on these skills: {all_skills}, what would be the most relevant job title to search for? Give only the job title, nothing else."
+    return _start_turn(
+        "resume", all_skills, skill_prompt,
+        lambda on_partial: llm.analyze_resume_turn(llm.get_model(), all_skills, on_partial=on_partial),
+        enrich=enrich,
+    )
+
+
+def run_turn(run, deadline=market_data.LOOKUP_DEADLINE, skills=None):
+    """
+    Wait for a turn started with `start_career_turn` or `start_resume_turn`, without streaming.
+    Raises `NotCareerQuestion` when the structured call classifies the message otherwise.
+    Market lookups, if started, get `deadline` seconds after the analysis and keyword are
+    done; their results are returned under "market", with the job postings ranked
+    against `skills` (or the keyword when there are none).
+    """
+    try:
+        result = {"analysis": run.result("analysis"), "keyword": run.result("keyword")}
+        if "jobs" in run.futures:
+            market = result["market"] = dict(market_data.EMPTY_RESULTS, stale={})
+            for key, (value, stale_age), _ in run.events(LOOKUP_STAGES, deadline):
+                market[key] = value
+                if stale_age is not None:
+                    market["stale"][key] = round(stale_age)
+            market["jobs"] = rank_jobs(market["jobs"], skills, result["keyword"])
+        return result
+    finally:
+        run.cancel()
+
+
+def rank_jobs(jobs, skills, keyword=None):
+    """Best-fitting postings for the user's skills, falling back to the search keyword"""
+    return job_ranking.rank_jobs(jobs, skills or ([keyword] if keyword else []))
+
+
+def extract_resume(data, mime_type):
+    """
+    Return `(skills, error)` for an uploaded resume.
+    `error` is a message for the user when the file is not a usable resume, in which case `skills` is empty.
+    """
+    return resume_parser.extract_skills_from_resume(data, mime_type, llm.get_model())
+
+
+def store_profile(skills, label=""):
+    """Embed the skills and add the profile to the shared, persistent index"""
+    # Imported here: faiss is slow to import and only needed once a resume is uploaded
+    from skill_index import get_skill_index
+    get_skill_index().add_profile(skills, label=label)
+
+
+def format_job_list(jobs, empty_message):
+    if not jobs:
+        return empty_message
+    lines = []
+    for job in jobs[:job_ranking.TOP_N]:
+        line = f"- {job.get('job_title', 'N/A')} at {job.get('employer_name', 'N/A')}"
+        if "match_score" in job:
+            line += f" ({job['match_score']:.0%} match"
+            line += f": {', '.join(job['matched_skills'][:4])})" if job.get("matched_skills") else ")"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def format_course_list(courses, empty_message):
+    if not courses:
+        return empty_message
+    return "\n".join([f"- [{course.get('title', 'N/A')}]({course.get('url', '#')})" for course in courses[:3]])
+
+
+def format_salary(salary):
+    return f"Median Salary: {salary if salary != 'N/A' else 'Data not available'}"
+
+
+def format_stale_note(stale_age):
+    """A note for results served from an old cache entry because the provider is unavailable"""
+    if stale_age < 3600:
+        age = f"{max(1, round(stale_age / 60))} min"
+    elif stale_age < 2 * 86400:
+        age = f"{round(stale_age / 3600)} h"
+    else:
+        age = f"{round(stale_age / 86400)} days"
+    return f"_Cached {age} ago; live data is unavailable right now._"
+
+
+def greeting_prompt(user_input):
+    return f"""
+    The user says: "{user_input}"
+
+    Respond with a warm, friendly greeting as the Career Path Oracle.
+    Include a brief introduction about what you can help with (career guidance, skill analysis, etc.).
+    Keep it under 3 sentences.
+    """
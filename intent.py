@@ -0,0 +1,136 @@
+import logging
+import os
+import re
+import threading
+
+import numpy as np
+
+from embeddings import embed_text, embed_texts
+
+logger = logging.getLogger(__name__)
+
+LABELS = ("greeting", "chat", "career")
+
+# Below this confidence the local classifier defers to the LLM
+CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.6"))
+
+_GREETING_RE = re.compile(
+    r"^(hi|hii+|hello|hey|heya|hiya|yo|howdy|greetings|good (morning|afternoon|evening)|"
+    r"namaste|sup|what'?s up)( there)?( oracle| bot)?[\s!.,?]*$",
+    re.IGNORECASE,
+)
+_CHAT_RE = re.compile(
+    r"\b(who (are|made|created|built) you|what are you|what'?s your name|your name|"
+    r"where are you from|are you (a |an )?(bot|ai|human|real)|how are you|"
+    r"who (is|are) your (creator|creators|team)|tell me about yourself|do you like)\b",
+    re.IGNORECASE,
+)
+_CAREER_RE = re.compile(
+    r"\b(career|careers|job|jobs|skill|skills|resume|cv|salary|salaries|interview|"
+    r"hiring|internship|developer|engineer|engineering|analyst|scientist|designer|manager|"
+    r"data science|machine learning|programming|python|java|course|courses|learn|"
+    r"certification|promotion|transition|profession|professional|work as|role|roles|degree|"
+    r"major|internships|hire|industry|field)\b",
+    re.IGNORECASE,
+)
+
+# Labelled examples for the nearest-neighbour model, drawn from the prompt categories
+_EXAMPLES = {
+    "greeting": [
+        "hi", "hello", "hey there", "good morning", "hello oracle", "hi, nice to meet you",
+        "hey, I'm new here", "greetings", "good evening", "hello, my name is sam",
+    ],
+    "chat": [
+        "who are you", "what is your name", "where are you from", "who created you",
+        "what are you", "are you a robot", "how are you today", "what do you like to do",
+        "tell me about yourself", "what are your hobbies", "who built this bot",
+        "are you human", "where do you live", "what's your favourite thing",
+    ],
+    "career": [
+        "what skills do I need for data science", "best career paths for python developers",
+        "how can I transition to AI engineering", "how do I become a software engineer",
+        "what jobs can I get with a marketing degree", "salary of a data analyst",
+        "how do I improve my resume", "which courses should I take to learn cloud computing",
+        "I know java and sql, what roles fit me", "is UX design a good career",
+        "how to prepare for a product manager interview", "I want to switch to cybersecurity",
+        "what should I learn to become a devops engineer", "jobs for mechanical engineers",
+    ],
+}
+
+_stats_lock = threading.Lock()
+_stats = {"local": 0, "fallback": 0, "fallback_errors": 0}
+_model = None
+
+
+def _nearest_neighbour_model():
+    global _model
+    if _model is None:
+        labels, texts = [], []
+        for label, examples in _EXAMPLES.items():
+            labels.extend([label] * len(examples))
+            texts.extend(examples)
+        _model = (np.array(labels), embed_texts(texts))
+    return _model
+
+
+def classify(user_input):
+    """Classify a message locally. Returns `(label, confidence)`.
+
+    Unambiguous rule matches are returned with full confidence. Otherwise the
+    message is compared with the labelled examples, and confidence is the
+    best class similarity minus a share of the runner-up's.
+    """
+    text = user_input.strip()
+    if _GREETING_RE.match(text):
+        return "greeting", 1.0
+    chat_hit = bool(_CHAT_RE.search(text))
+    career_hit = bool(_CAREER_RE.search(text))
+    if chat_hit and not career_hit:
+        return "chat", 1.0
+    if career_hit and not chat_hit:
+        return "career", 0.9
+
+    labels, vectors = _nearest_neighbour_model()
+    similarities = vectors @ embed_text(text)
+    best = {label: float(similarities[labels == label].max()) for label in LABELS}
+    ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)
+    (label, top), (_, runner_up) = ranked[0], ranked[1]
+    confidence = max(0.0, min(1.0, top - 0.5 * runner_up))
+    return label, confidence
+
+
+def detect_message_type(user_input, fallback):
+    """Return "greeting", "chat" or "career" for `user_input`.
+
+    The local classifier answers when it is confident enough; otherwise
+    `fallback(user_input)` (the LLM classifier) is called. Every decision is
+    logged so the fallback rate can be measured, see `intent_stats()`.
+    """
+    label, confidence = classify(user_input)
+    if confidence >= CONFIDENCE_THRESHOLD:
+        with _stats_lock:
+            _stats["local"] += 1
+        logger.info("intent=%s source=local confidence=%.2f", label, confidence)
+        return label
+
+    try:
+        result = fallback(user_input)
+    except Exception as e:
+        with _stats_lock:
+            _stats["fallback_errors"] += 1
+        logger.warning("LLM intent fallback failed (%s); using local guess %s", e, label)
+        return label
+
+    with _stats_lock:
+        _stats["fallback"] += 1
+    logger.info("intent=%s source=llm local_guess=%s confidence=%.2f", result, label, confidence)
+    return result
+
+
+def intent_stats():
+    """Counts of local and LLM decisions and the resulting fallback rate."""
+    with _stats_lock:
+        stats = dict(_stats)
+    decisions = stats["local"] + stats["fallback"] + stats["fallback_errors"]
+    stats["fallback_rate"] = (stats["fallback"] + stats["fallback_errors"]) / decisions if decisions else 0.0
+    return stats
@@ -0,0 +1,56 @@
+import os
+
+import numpy as np
+
+import tracing
+from embeddings import embed_counts, embed_skills, token_counts, tokenize
+
+# Postings shown per answer, and how much the score leans on embedding
+# similarity versus the share of the user's skills a posting names
+TOP_N = int(os.getenv("JOB_RANK_TOP_N", "5"))
+SIMILARITY_WEIGHT = float(os.getenv("JOB_RANK_SIMILARITY_WEIGHT", "0.5"))
+
+
+def _job_text(job):
+    required = job.get("job_required_skills") or []
+    if isinstance(required, str):
+        required = [required]
+    return " ".join([job.get("job_title") or "", ", ".join(map(str, required)), job.get("job_description") or ""])
+
+
+@tracing.traced("jobs.rank")
+def rank_jobs(jobs, skills, top_n=TOP_N):
+    """Return the `top_n` postings that best fit `skills`, best first.
+
+    All postings are scored in one batch from a shared token-count matrix: the
+    cosine similarity between each posting (title, required skills and
+    description) and the skill profile, blended with the share of the skills
+    whose words all appear in the posting.
+    Each returned posting is a copy with "match_score" (0 to 1) and
+    "matched_skills". Without skills, the provider's order is kept.
+    """
+    skills = [s for s in dict.fromkeys(str(s).strip() for s in skills or []) if s]
+    if not jobs or not skills:
+        return [dict(job) for job in (jobs or [])[:top_n]]
+
+    counts, vocabulary = token_counts([_job_text(job) for job in jobs])
+    similarity = embed_counts(counts, vocabulary) @ embed_skills(skills)
+
+    # A skill is named by a posting when all of its tokens occur in it
+    present = np.ones((len(jobs), len(skills)), dtype=bool)
+    for column, skill in enumerate(skills):
+        for token in tokenize(skill):
+            index = vocabulary.get(token.rstrip("."))
+            present[:, column] &= counts[:, index] > 0 if index is not None else False
+    overlap = present.mean(axis=1)
+
+    scores = SIMILARITY_WEIGHT * np.clip(similarity, 0.0, 1.0) + (1 - SIMILARITY_WEIGHT) * overlap
+    top = np.argsort(-scores, kind="stable")[:top_n]
+    return [
+        dict(
+            jobs[i],
+            match_score=round(float(scores[i]), 3),
+            matched_skills=[skill for skill, hit in zip(skills, present[i]) if hit],
+        )
+        for i in top
+    ]
@@ -0,0 +1,323 @@
+import json
+import logging
+import os
+import re
+import threading
+
+import ratelimit
+import tracing
+
+logger = logging.getLogger(__name__)
+
+INTENTS = ("greeting", "chat", "career")
+
+# One structured call per career turn instead of separate classify/analyze/extract prompts
+COMBINED_MODE = os.getenv("LLM_COMBINED_MODE", "1") == "1"
+STRUCTURED_ATTEMPTS = int(os.getenv("LLM_STRUCTURED_ATTEMPTS", "2"))
+MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+# Longest a call waits for a slot under the Gemini rate limit before failing
+RATE_LIMIT_WAIT = 30
+
+_JSON_INSTRUCTIONS = """
+Respond with ONLY a JSON object, no markdown fences or commentary, matching this schema:
+{
+  "intent": "greeting" | "chat" | "career",
+  "keyword": string,        // a single professional skill or job title to search for, "" if not career
+  "skills": [string],       // the user's top 3 skills
+  "career_paths": [string]  // 3 suggested career paths, each with a short reason
+}
+"""
+
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$", re.IGNORECASE)
+
+
+_model = None
+_model_lock = threading.Lock()
+# Identical prompts already in flight share one (non-streamed) Gemini call
+_flights = ratelimit.SingleFlight()
+
+
+class StructuredOutputError(ValueError):
+    """The model's reply could not be parsed into the expected JSON shape."""
+
+
+def _text_bytes(response):
+    try:
+        return len((response.text or "").encode())
+    except ValueError:
+        # Replies without text parts (e.g. a bare finish reason or a blocked prompt)
+        return 0
+
+
+class TracedModel:
+    """Wraps a GenerativeModel so every `generate_content` call is recorded as a span.
+
+    Spans carry the call's duration, outcome and prompt and reply sizes; a
+    streamed call ends when its reply has been fully consumed. Calls also go
+    through the "gemini" rate limiter, which retries throttled (429) calls, and
+    identical non-streamed prompts in flight at the same time are sent once.
+    """
+
+    def __init__(self, model):
+        self._model = model
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        span = tracing.start_span(
+            "llm.generate_content", "llm", model=MODEL_NAME, stream=stream, request_bytes=len(str(prompt).encode())
+        )
+        limiter = ratelimit.get_limiter("gemini")
+
+        def call():
+            return limiter.call(lambda: self._model.generate_content(prompt, stream=stream, **kwargs), timeout=RATE_LIMIT_WAIT)
+
+        try:
+            if not stream and not kwargs and isinstance(prompt, str):
+                response, shared = _flights.do(prompt, call)
+                span.set(coalesced=shared)
+            else:
+                response = call()
+        except Exception as e:
+            span.end(error=e)
+            raise
+        if stream:
+            return self._traced_stream(response, span)
+        span.set(response_bytes=_text_bytes(response))
+        span.end()
+        return response
+
+    @staticmethod
+    def _traced_stream(response, span):
+        size, completed = 0, False
+        try:
+            for chunk in response:
+                if "first_chunk_ms" not in span.attrs:
+                    span.set(first_chunk_ms=round(span.duration * 1000, 1))
+                size += _text_bytes(chunk)
+                yield chunk
+            completed = True
+        except Exception as e:
+            span.end(error=e)
+            raise
+        finally:
+            span.set(response_bytes=size)
+            # Not completed without an error: the consumer stopped iterating part-way
+            span.end(status="ok" if completed else "cancelled")
+
+
+def get_model():
+    """Return the process-wide Gemini model, configuring the client on first use.
+
+    google.generativeai is imported here rather than at module level because
+    it is slow to import and the intro page never needs it. The model is
+    wrapped in `TracedModel` so each call shows up in the turn's trace.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                import google.generativeai as genai
+
+                genai.configure(api_key=os.getenv("GEMINI_API_KEY", "your-gemini-api-key"))
+                _model = TracedModel(genai.GenerativeModel(MODEL_NAME))
+    return _model
+
+
+def context_block(context):
+    """Earlier conversation to prepend to a prompt, or nothing without any."""
+    if not context:
+        return ""
+    return f"""
+    Conversation so far, for context only:
+    \"\"\"
+    {context}
+    \"\"\"
+    """
+
+
+def career_turn_prompt(user_input, context=None):
+    return f"""{context_block(context)}
+    Analyze the user's message: "{user_input}"
+
+    Categorize it as ONE of the following:
+    1. "greeting" - if it's just a simple hello or introduction
+    2. "chat" - if the user is asking personal questions about the bot itself (like "who are you", "where are you from", "what's your name", etc.)
+    3. "career" - if the user is asking about careers, jobs, skills, resume advice, or other professional topics
+
+    If it is "career", identify their top 3 skills, suggest 3 career paths, and extract
+    a single professional skill or job title to search job boards for.
+    {_JSON_INSTRUCTIONS}
+    """
+
+
+def resume_turn_prompt(skills_text):
+    return f"""
+    These skills were extracted from the user's resume: {skills_text}
+
+    The intent is "career". Identify their top 3 skills, suggest 3 career paths, and give
+    the most relevant job title to search for as the keyword.
+    {_JSON_INSTRUCTIONS}
+    """
+
+
+def parse_json_response(text):
+    """Pull the first JSON object out of a model reply, tolerating fences and chatter."""
+    text = _FENCE_RE.sub("", text.strip())
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end < start:
+        raise StructuredOutputError("no JSON object in model reply")
+    try:
+        return json.loads(text[start:end + 1])
+    except json.JSONDecodeError as e:
+        raise StructuredOutputError(f"malformed JSON in model reply: {e}") from e
+
+
+def _string_list(value, field):
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        raise StructuredOutputError(f"{field} must be a list of strings")
+    return [str(item).strip() for item in value if str(item).strip()][:3]
+
+
+def validate_career_turn(data):
+    """Check a parsed reply against the career-turn schema and normalize it."""
+    if not isinstance(data, dict):
+        raise StructuredOutputError("reply is not a JSON object")
+    intent = str(data.get("intent", "")).strip().lower()
+    if intent not in INTENTS:
+        raise StructuredOutputError(f"unknown intent {intent!r}")
+
+    result = {
+        "intent": intent,
+        "keyword": str(data.get("keyword") or "").strip(),
+        "skills": _string_list(data.get("skills", []), "skills"),
+        "career_paths": _string_list(data.get("career_paths", []), "career_paths"),
+    }
+    if intent == "career":
+        if not result["keyword"]:
+            if not result["skills"]:
+                raise StructuredOutputError("career reply has neither keyword nor skills")
+            result["keyword"] = result["skills"][0]
+        if not result["skills"] and not result["career_paths"]:
+            raise StructuredOutputError("career reply has no analysis")
+    return result
+
+
+def generate_structured(model, prompt, attempts=STRUCTURED_ATTEMPTS, last_error=None):
+    """Call the model and return its validated career-turn JSON, retrying malformed replies."""
+    for attempt in range(attempts):
+        request = prompt
+        if last_error is not None:
+            request = (
+                f"{prompt}\nYour previous reply could not be used ({last_error}). "
+                "Reply again with only the JSON object."
+            )
+        response = model.generate_content(request)
+        try:
+            return validate_career_turn(parse_json_response(response.text))
+        except StructuredOutputError as e:
+            last_error = e
+            logger.warning("Structured reply rejected (attempt %d/%d): %s", attempt + 1, attempts, e)
+    raise StructuredOutputError(str(last_error))
+
+
+def iter_text(model, prompt):
+    """Yield the text of a streamed model reply chunk by chunk."""
+    for chunk in model.generate_content(prompt, stream=True):
+        try:
+            text = chunk.text
+        except ValueError:
+            # Chunks without text parts (e.g. a bare finish reason) carry nothing to show
+            continue
+        if text:
+            yield text
+
+
+_STRING = r'"((?:[^"\\]|\\.)*)"'
+_ITEM_RE = re.compile(r"\s*" + _STRING + r"\s*([,\]])")
+
+
+def _decode(raw):
+    try:
+        return json.loads(f'"{raw}"')
+    except json.JSONDecodeError:
+        return raw
+
+
+def parse_partial_turn(buffer):
+    """Read the fields that are already complete from a partially streamed career-turn reply.
+
+    Returns a dict with whichever of "intent", "keyword", "skills" and
+    "career_paths" can be read so far; list fields hold only finished items.
+    """
+    partial = {}
+    for field in ("intent", "keyword"):
+        match = re.search(rf'"{field}"\s*:\s*{_STRING}', buffer)
+        if match:
+            partial[field] = _decode(match.group(1)).strip()
+    for field in ("skills", "career_paths"):
+        match = re.search(rf'"{field}"\s*:\s*\[', buffer)
+        if not match:
+            continue
+        items, pos = [], match.end()
+        while True:
+            item = _ITEM_RE.match(buffer, pos)
+            if not item:
+                break
+            items.append(_decode(item.group(1)).strip())
+            if item.group(2) == "]":
+                break
+            pos = item.end()
+        partial[field] = items[:3]
+    return partial
+
+
+def stream_structured(model, prompt, on_partial):
+    """Like `generate_structured`, but streams the reply and reports progress.
+
+    `on_partial` is called with `parse_partial_turn` of the reply so far after
+    every chunk. A reply that turns out malformed is retried without streaming.
+    """
+    buffer = ""
+    for text in iter_text(model, prompt):
+        buffer += text
+        on_partial(parse_partial_turn(buffer))
+    try:
+        return validate_career_turn(parse_json_response(buffer))
+    except StructuredOutputError as e:
+        logger.warning("Streamed structured reply rejected: %s", e)
+        if STRUCTURED_ATTEMPTS < 2:
+            raise
+        return generate_structured(model, prompt, STRUCTURED_ATTEMPTS - 1, last_error=e)
+
+
+def format_analysis(turn):
+    """Render the skills and career paths of a (possibly partial) turn as a bulleted list."""
+    lines = ["**Top skills:**"]
+    lines += [f"- {skill}" for skill in turn.get("skills", [])] or ["- Not identified"]
+    lines += ["", "**Suggested career paths:**"]
+    lines += [f"- {path}" for path in turn.get("career_paths", [])] or ["- Not identified"]
+    return "\n".join(lines)
+
+
+def analyze_career_turn(model, user_input, on_partial=None, context=None):
+    """Classify, analyze and pick a search keyword for a message in a single LLM call.
+
+    With `on_partial`, the reply is streamed and partial results are reported as they arrive.
+    `context` is a summary of the conversation so far (see chat_history.py).
+    """
+    prompt = career_turn_prompt(user_input, context)
+    if on_partial is not None:
+        return stream_structured(model, prompt, on_partial)
+    return generate_structured(model, prompt)
+
+
+def analyze_resume_turn(model, skills_text, on_partial=None):
+    """Analyze resume skills and pick a job title to search for in a single LLM call."""
+    prompt = resume_turn_prompt(skills_text)
+    if on_partial is not None:
+        return stream_structured(model, prompt, on_partial)
+    return generate_structured(model, prompt)
@@ -0,0 +1,157 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+CACHE_PATH = os.getenv("MARKET_CACHE_PATH", os.path.join(".cache", "market_data.sqlite3"))
+MAX_ENTRIES = int(os.getenv("MARKET_CACHE_MAX_ENTRIES", "5000"))
+
+# Time-to-live per source, in seconds. Postings churn faster than salaries or courses.
+DEFAULT_TTLS = {
+    "jobs": int(os.getenv("MARKET_CACHE_TTL_JOBS", str(6 * 3600))),
+    "salary": int(os.getenv("MARKET_CACHE_TTL_SALARY", str(24 * 3600))),
+    "courses": int(os.getenv("MARKET_CACHE_TTL_COURSES", str(24 * 3600))),
+}
+# How old an expired entry may be and still be served while its provider is down
+STALE_MAX_AGE = int(os.getenv("MARKET_CACHE_STALE_MAX_AGE", str(7 * 24 * 3600)))
+
+
+def normalize_skill(skill):
+    """Normalize a skill or job title so equivalent queries share a cache key."""
+    skill = re.sub(r"\s+", " ", str(skill)).strip().lower()
+    return skill.strip(" .,;:!?\"'`")
+
+
+class MarketDataCache:
+    """On-disk TTL cache with bounded LRU eviction, backed by SQLite.
+
+    Every process on the host opens the same database file, so Streamlit
+    workers share entries and they survive restarts. Hit, miss and eviction
+    counts are tracked per process and reported by `stats()`.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES, ttls=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "stale_hits": 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS market_cache (
+                    source TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    stored_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (source, key)
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS market_cache_lru ON market_cache (last_access)")
+
+    def _connect(self):
+        # sqlite3 connections cannot be shared between threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def get(self, source, skill):
+        """Return `(True, value)` for a fresh entry, or `(False, None)` on a miss."""
+        key = normalize_skill(skill)
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value, expires_at FROM market_cache WHERE source = ? AND key = ?",
+            (source, key),
+        ).fetchone()
+        if row is None or row[1] <= now:
+            self._count("misses")
+            return False, None
+
+        conn.execute(
+            "UPDATE market_cache SET last_access = ? WHERE source = ? AND key = ?",
+            (now, source, key),
+        )
+        self._count("hits")
+        return True, json.loads(row[0])
+
+    def has_stale(self, source, skill, max_age=STALE_MAX_AGE):
+        """Whether `get_stale` would return an entry; reads no value and counts nothing."""
+        row = self._connect().execute(
+            "SELECT 1 FROM market_cache WHERE source = ? AND key = ? AND stored_at > ?",
+            (source, normalize_skill(skill), time.time() - max_age),
+        ).fetchone()
+        return row is not None
+
+    def get_stale(self, source, skill, max_age=STALE_MAX_AGE):
+        """Return `(value, stored_at)` for an entry up to `max_age` seconds old, expired or not, else None.
+
+        Expired entries stay in the table until they are overwritten or
+        evicted, so this is the fallback when a provider cannot be reached.
+        Every entry returned counts as a stale hit, so call it only to serve one.
+        """
+        row = self._connect().execute(
+            "SELECT value, stored_at FROM market_cache WHERE source = ? AND key = ? AND stored_at > ?",
+            (source, normalize_skill(skill), time.time() - max_age),
+        ).fetchone()
+        if row is None:
+            return None
+        self._count("stale_hits")
+        return json.loads(row[0]), row[1]
+
+    def set(self, source, skill, value):
+        key = normalize_skill(skill)
+        now = time.time()
+        ttl = self.ttls.get(source, min(self.ttls.values()))
+        conn = self._connect()
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO market_cache (source, key, value, stored_at, expires_at, last_access)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (source, key, json.dumps(value), now, now + ttl, now),
+        )
+        self._evict(conn)
+
+    def _evict(self, conn):
+        (count,) = conn.execute("SELECT COUNT(*) FROM market_cache").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                """
+                DELETE FROM market_cache WHERE rowid IN (
+                    SELECT rowid FROM market_cache ORDER BY last_access LIMIT ?
+                )
+                """,
+                (overflow,),
+            )
+            self._count("evictions", overflow)
+
+    def clear(self):
+        self._connect().execute("DELETE FROM market_cache")
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        (stats["entries"],) = self._connect().execute("SELECT COUNT(*) FROM market_cache").fetchone()
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,364 @@
+import contextvars
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import catalog
+import ratelimit
+import resilience
+import tracing
+from market_cache import MarketDataCache, normalize_skill
+
+logger = logging.getLogger(__name__)
+
+# Per-call timeouts (seconds) and the overall budget for one round of lookups
+CONNECT_TIMEOUT = float(os.getenv("MARKET_DATA_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("MARKET_DATA_READ_TIMEOUT", "5"))
+LOOKUP_DEADLINE = float(os.getenv("MARKET_DATA_DEADLINE", "6"))
+CACHE_ENABLED = os.getenv("MARKET_CACHE_ENABLED", "1") == "1"
+# A GET still running past this percentile of the provider's recent latencies
+# gets a second, hedged request (0 disables hedging)
+HEDGE_PERCENTILE = float(os.getenv("MARKET_DATA_HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_DELAY = float(os.getenv("MARKET_DATA_HEDGE_MIN_DELAY", "0.05"))
+# JSearch result pages per job lookup, fetched in one request (JSearch may bill
+# a multi-page request as more than one)
+JOB_PAGES = int(os.getenv("MARKET_DATA_JOB_PAGES", "1"))
+# Items a lookup returns from the local catalog; a live lookup returns up to this many too
+CATALOG_LIMITS = {"jobs": JOB_PAGES * 10, "courses": 3}
+# Posting fields kept (and cached); descriptions are cut to what ranking reads
+JOB_FIELDS = ("job_id", "job_title", "employer_name", "job_city", "job_country", "job_apply_link", "job_required_skills")
+JOB_DESCRIPTION_CHARS = 1500
+
+# Endpoints can be overridden to point at staging or local stand-ins (see bench/)
+JSEARCH_URL = os.getenv("JSEARCH_URL", "https://jsearch.p.rapidapi.com/search")
+ADZUNA_URL = os.getenv("ADZUNA_URL", "https://api.adzuna.com/v1/api/jobs/gb/histogram")
+UDEMY_URL = os.getenv("UDEMY_URL", "https://udemy-paid-courses-for-free-api.p.rapidapi.com/rapidapi/courses/search")
+
+# Values returned when a lookup fails or misses the deadline
+EMPTY_RESULTS = {"jobs": [], "salary": "N/A", "courses": []}
+
+_session = None
+_session_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=12, thread_name_prefix="market-data")
+# Individual HTTP attempts, so a slow one can be raced by a hedged duplicate
+_http_executor = ThreadPoolExecutor(max_workers=64, thread_name_prefix="market-http")
+_cache = None
+_cache_lock = threading.Lock()
+# Concurrent lookups of the same source and skill share one upstream request
+_flights = ratelimit.SingleFlight()
+# How long a GET may wait for a rate-limit slot; none while an expired cache
+# entry can be served instead (set per lookup, carried into page fetches)
+_slot_wait = contextvars.ContextVar("market_data_slot_wait", default=LOOKUP_DEADLINE)
+
+
+def get_session():
+    """Return the process-wide HTTP session, creating it on first use.
+
+    The session keeps connections alive, so repeated lookups against the same
+    provider reuse the TLS connection instead of opening a new one.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32, max_retries=0)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def get_cache():
+    """Return the shared market-data cache, or None when caching is disabled or unavailable."""
+    global _cache, CACHE_ENABLED
+    if _cache is None and CACHE_ENABLED:
+        with _cache_lock:
+            if _cache is None and CACHE_ENABLED:
+                try:
+                    _cache = MarketDataCache()
+                except (sqlite3.Error, OSError) as e:
+                    logger.warning("Market data cache disabled: %s", e)
+                    CACHE_ENABLED = False
+    return _cache
+
+
+def cache_stats():
+    """Hit, miss and eviction counts for the market-data cache."""
+    cache = get_cache()
+    return cache.stats() if cache is not None else {}
+
+
+def _is_provider_failure(outcome):
+    """Whether an outcome of `_get` counts against the provider's circuit."""
+    if isinstance(outcome, ratelimit.RateLimitExceeded):
+        # Our own limit ran out; the request never reached the provider
+        return False
+    if isinstance(outcome, Exception):
+        return True
+    return outcome.status_code >= 500 or outcome.status_code == 429
+
+
+def _get(provider, url, **kwargs):
+    """GET from `provider` behind its circuit breaker and rate limit.
+
+    429s are retried with backoff within the lookup deadline, or not at all
+    when the lookup has an expired cache entry to fall back on. A request still
+    running past the provider's HEDGE_PERCENTILE latency is raced by a hedged
+    duplicate (if the rate limit has a token spare) and the first answer
+    wins. Raises `resilience.CircuitOpen` without calling out while the
+    provider keeps failing.
+    """
+    breaker = resilience.get_breaker(provider)
+    limiter = ratelimit.get_limiter(provider)
+    latencies = resilience.get_latency_tracker(provider)
+
+    def attempt():
+        started = time.perf_counter()
+        response = get_session().get(url, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), **kwargs)
+        if response.status_code < 400:
+            latencies.record(time.perf_counter() - started)
+        return response
+
+    def send():
+        threshold = latencies.percentile(HEDGE_PERCENTILE) if HEDGE_PERCENTILE > 0 else None
+        if threshold is None:
+            return attempt()
+        response, hedged = resilience.hedged_call(
+            _http_executor,
+            attempt,
+            max(HEDGE_MIN_DELAY, threshold),
+            may_hedge=lambda: breaker.state == "closed" and limiter.bucket.try_acquire() == 0.0,
+        )
+        span.set(hedged=hedged)
+        return response
+
+    with tracing.span(f"http.{provider}", "http", method="GET", host=urlsplit(url).netloc) as span:
+        response = breaker.call(lambda: limiter.call(send, timeout=_slot_wait.get()), is_failure=_is_provider_failure)
+        span.set(response_bytes=len(response.content))
+        span.end(status=response.status_code)
+        return response
+
+
+def _slim_job(job):
+    slim = {field: job[field] for field in JOB_FIELDS if job.get(field) is not None}
+    slim["job_description"] = (job.get("job_description") or "")[:JOB_DESCRIPTION_CHARS]
+    return slim
+
+
+def _fetch_job_postings(skill):
+    """Fetch the first JOB_PAGES pages of postings in one request, de-duplicated by job id."""
+    headers = {
+        "X-RapidAPI-Key": os.getenv("JSEARCH_API_KEY", "your-jsearch-api-key"),
+        "X-RapidAPI-Host": "jsearch.p.rapidapi.com"
+    }
+    params = {
+        "query": skill,
+        "page": 1,
+        "num_pages": JOB_PAGES
+    }
+    response = _get("jsearch", JSEARCH_URL, headers=headers, params=params)
+    response.raise_for_status()
+    jobs, seen = [], set()
+    for job in response.json().get("data", []):
+        key = job.get("job_id") or (job.get("job_title"), job.get("employer_name"))
+        if key not in seen:
+            seen.add(key)
+            jobs.append(_slim_job(job))
+    return jobs
+
+
+def _fetch_salary_data(job_title):
+    params = {
+        "app_id": os.getenv("ADZUNA_APP_ID", "your-adzuna-app-id"),
+        "app_key": os.getenv("ADZUNA_APP_KEY", "your-adzuna-app-key"),
+        "what": job_title
+    }
+    response = _get("adzuna", ADZUNA_URL, params=params)
+    response.raise_for_status()
+    return response.json().get("median_salary", "N/A")
+
+
+def _fetch_free_courses(skill):
+    headers = {
+        "X-RapidAPI-Key": os.getenv("UDEMY_API_KEY", "your-udemy-api-key"),
+        "X-RapidAPI-Host": "udemy-paid-courses-for-free-api.p.rapidapi.com"
+    }
+    params = {
+        "query": skill,
+        "language": "en",
+        "page": 1,
+        "page_size": 10
+    }
+    response = _get("udemy", UDEMY_URL, headers=headers, params=params)
+    response.raise_for_status()
+    courses = response.json().get("courses", [])
+    return courses[:3] if courses else []
+
+
+def _cached_lookup(source, fetch, skill):
+    """Serve `source` results for `skill` from the local catalog or the cache, fetching on a miss.
+
+    Returns `(value, stale_age)`. Jobs and courses come from the catalog when
+    it has enough items with the skill in their title or required skills. Only successful responses are stored. When the
+    fetch fails (or the provider's circuit is open) an expired entry is
+    served instead, with `stale_age` set to its age in seconds, or failing
+    that whatever the catalog matched, fuzzy matches included; with neither, the empty value is
+    returned. Identical lookups already in flight are joined rather than
+    repeated. A blank `skill` is answered with the empty value without a lookup.
+    """
+    if not skill or not skill.strip():
+        return EMPTY_RESULTS[source], None
+    with tracing.span(f"market.{source}", query=skill) as span:
+        result, shared = _flights.do((source, normalize_skill(skill)), lambda: _lookup(source, fetch, skill, span))
+        span.set(coalesced=shared)
+        return result
+
+
+def _lookup(source, fetch, skill, span):
+    local, exact = _catalog_search(source, skill)
+    if local is not None:
+        span.set(catalog=len(local), catalog_exact=exact)
+        # Other matches only fill out a list; the query has to be covered by the titles
+        if exact >= catalog.MIN_RESULTS[source]:
+            return local, None
+
+    cache = get_cache()
+    if cache is not None:
+        try:
+            hit, value = cache.get(source, skill)
+            span.set(cache="hit" if hit else "miss")
+            if hit:
+                return value, None
+        except sqlite3.Error as e:
+            logger.warning("Market data cache read failed: %s", e)
+
+    # With an old entry to fall back on, a throttled provider is not worth waiting for
+    token = _slot_wait.set(0.0 if _has_stale(cache, source, skill) else LOOKUP_DEADLINE)
+    try:
+        value = fetch(skill)
+    except Exception as e:
+        logger.warning("Error fetching %s data: %s", source, e)
+        stale = _stale(cache, source, skill)
+        if stale is not None:
+            span.set(stale_age_s=round(stale[1]))
+        span.end(error=e)
+        return stale or (local or EMPTY_RESULTS[source], None)
+    finally:
+        _slot_wait.reset(token)
+
+    if cache is not None:
+        try:
+            cache.set(source, skill, value)
+        except sqlite3.Error as e:
+            logger.warning("Market data cache write failed: %s", e)
+    if catalog.LEARN and source in catalog.KINDS and catalog.get_catalog() is not None:
+        catalog.get_catalog().learn(source, value)
+    return value, None
+
+
+def _catalog_search(source, skill):
+    """`(items, exact)` from the catalog for a jobs or courses lookup; items are None when it cannot answer."""
+    if source not in catalog.KINDS:
+        return None, 0
+    local = catalog.get_catalog()
+    if local is None:
+        return None, 0
+    try:
+        return local.search(source, skill, CATALOG_LIMITS[source]) or (None, 0)
+    except sqlite3.Error as e:
+        logger.warning("Catalog search failed: %s", e)
+        return None, 0
+
+
+def _has_stale(cache, source, skill):
+    if cache is None:
+        return False
+    try:
+        return cache.has_stale(source, skill)
+    except sqlite3.Error as e:
+        logger.warning("Market data cache read failed: %s", e)
+        return False
+
+
+def _stale(cache, source, skill):
+    if cache is None:
+        return None
+    try:
+        entry = cache.get_stale(source, skill)
+    except sqlite3.Error as e:
+        logger.warning("Market data cache read failed: %s", e)
+        return None
+    if entry is None:
+        return None
+    value, stored_at = entry
+    return value, max(0.0, time.time() - stored_at)
+
+
+def get_job_postings(skill):
+    return _cached_lookup("jobs", _fetch_job_postings, skill)[0]
+
+
+def get_salary_data(job_title):
+    return _cached_lookup("salary", _fetch_salary_data, job_title)[0]
+
+
+def get_free_courses(skill):
+    return _cached_lookup("courses", _fetch_free_courses, skill)[0]
+
+
+# Each lookup returns `(value, stale_age)`; see `_cached_lookup`
+LOOKUPS = {
+    "jobs": lambda skill: _cached_lookup("jobs", _fetch_job_postings, skill),
+    "salary": lambda skill: _cached_lookup("salary", _fetch_salary_data, skill),
+    "courses": lambda skill: _cached_lookup("courses", _fetch_free_courses, skill),
+}
+
+
+def submit_market_data(skill):
+    """Start the job, salary and course lookups for `skill` in the background.
+
+    Returns a dict mapping each result key to its future.
+    """
+    return {key: tracing.submit(_executor, lookup, skill) for key, lookup in LOOKUPS.items()}
+
+
+def iter_completed(futures, deadline=LOOKUP_DEADLINE):
+    """Yield `(key, result, stale_age)` from `submit_market_data` as each lookup finishes.
+
+    `stale_age` is None for live or fresh cached data, and the age in seconds
+    of expired cached data served because the provider was unavailable.
+    Lookups still running after `deadline` seconds are abandoned, so one slow
+    provider cannot hold up the whole turn; callers keep the empty value for them.
+    """
+    by_future = {future: key for key, future in futures.items()}
+    try:
+        for future in as_completed(by_future, timeout=deadline):
+            yield (by_future[future], *future.result())
+    except TimeoutError:
+        for future, key in by_future.items():
+            if not future.done():
+                future.cancel()
+                logger.warning("%s lookup missed the %.1fs deadline", key, deadline)
+
+
+def fetch_market_data(skill, deadline=LOOKUP_DEADLINE):
+    """Run the job, salary and course lookups for `skill` concurrently.
+
+    Returns a dict with "jobs", "salary" and "courses" keys, plus "stale"
+    mapping any of them served from expired cache to its age in seconds.
+    Lookups that miss the deadline are reported with their empty value.
+    """
+    results = dict(EMPTY_RESULTS, stale={})
+    for key, value, stale_age in iter_completed(submit_market_data(skill), deadline):
+        results[key] = value
+        if stale_age is not None:
+            results["stale"][key] = round(stale_age)
+    return results
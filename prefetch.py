@@ -0,0 +1,124 @@
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import engine
+import market_data
+from market_cache import normalize_skill
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("PREFETCH_ENABLED", "1") == "1"
+# Skills and candidate job titles looked up per uploaded resume, besides the analysis turn's keyword
+TOP_N = int(os.getenv("PREFETCH_TOP_N", "3"))
+WORKERS = int(os.getenv("PREFETCH_WORKERS", "4"))
+# Queued lookups across all sessions; past this, new prefetches are skipped
+MAX_PENDING = int(os.getenv("PREFETCH_MAX_PENDING", "64"))
+
+_TITLE_RE = re.compile(
+    r"\b(engineer|developer|analyst|scientist|manager|designer|architect|consultant|"
+    r"administrator|specialist|lead|researcher|programmer)s?\b",
+    re.IGNORECASE,
+)
+
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="prefetch")
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+def is_job_title(term):
+    return bool(_TITLE_RE.search(term))
+
+
+def candidate_terms(skills, n=TOP_N):
+    """Pick what to look up for a resume: up to `n` job-title-like entries, then the top `n` skills."""
+    titles = [skill for skill in skills if is_job_title(skill)][:n]
+    terms, seen = [], set()
+    for term in titles + list(skills[:n]):
+        key = normalize_skill(term)
+        if key and key not in seen:
+            seen.add(key)
+            terms.append(term)
+    return terms
+
+
+class Prefetch:
+    """Work started speculatively for one resume.
+
+    `turn` is the resume's analysis turn (see `engine.start_resume_turn`),
+    whose memoized keyword drives the lookups the first summary shows; take
+    it over with `take_turn()`. The lookups for the resume's own titles and
+    skills land in the market-data cache (and are shared with identical
+    lookups in flight), so follow-up questions find them ready. `cancel()`
+    stops the turn unless it was taken and drops the lookups not yet started.
+    """
+
+    def __init__(self, skills, terms):
+        self.skills = tuple(skills)
+        self.terms = terms
+        self.turn = None
+        self.futures = []
+        self._cancelled = threading.Event()
+
+    def take_turn(self):
+        """The analysis turn, now owned (and cancelled when done) by the caller; None if there is none left"""
+        turn, self.turn = self.turn, None
+        return turn
+
+    def cancel(self):
+        self._cancelled.set()
+        if self.turn is not None:
+            self.turn.cancel()
+        for future in self.futures:
+            future.cancel()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def done(self):
+        return all(future.done() for future in self.futures)
+
+    def _run(self, lookup, term):
+        if not self.cancelled:
+            lookup(term)
+
+
+def _release(future):
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+
+
+def start(skills, n=TOP_N):
+    """Start a resume's analysis turn and background lookups for its top skills and titles.
+
+    Salary is looked up only for job titles; for a bare skill it would not be used.
+    """
+    global _pending
+    handle = Prefetch(skills, candidate_terms(skills, n))
+    if not ENABLED:
+        return handle
+    handle.turn = engine.start_resume_turn(", ".join(skills))
+    if market_data.get_cache() is None:
+        # Without the cache the other lookups' results would have nowhere to go
+        return handle
+    tasks = [
+        (lookup, term)
+        for term in handle.terms
+        for key, lookup in market_data.LOOKUPS.items()
+        if key != "salary" or is_job_title(term)
+    ]
+    with _pending_lock:
+        if _pending + len(tasks) > MAX_PENDING:
+            logger.info("Skipping prefetch for %s: %d lookups already queued", handle.terms, _pending)
+            return handle
+        _pending += len(tasks)
+    for lookup, term in tasks:
+        future = _executor.submit(handle._run, lookup, term)
+        future.add_done_callback(_release)
+        handle.futures.append(future)
+    logger.info("Prefetching market data for %s", handle.terms)
+    return handle
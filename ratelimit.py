@@ -0,0 +1,229 @@
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+# Requests per minute allowed to each provider, overridable as <PROVIDER>_RPM
+DEFAULT_RPM = {"gemini": 600, "jsearch": 300, "adzuna": 120, "udemy": 300}
+RETRY_ATTEMPTS = int(os.getenv("RATE_LIMIT_RETRIES", "3"))
+BACKOFF_BASE = float(os.getenv("RATE_LIMIT_BACKOFF", "0.5"))
+MAX_BACKOFF = 30.0
+
+
+class TokenBucket:
+    """Allows `rate` operations per second on average, in bursts of up to `capacity`.
+
+    Thread-safe; `acquire` blocks until a token is available.
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def set_rate(self, rate, capacity=None):
+        """Change the refill rate (and optionally the burst size) from now on."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+            if capacity is not None:
+                self.capacity = float(capacity)
+                self._tokens = min(self._tokens, self.capacity)
+
+    def try_acquire(self, tokens=1):
+        """Take `tokens` if they are available now; return how long to wait otherwise (0 on success)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens=1, timeout=None):
+        """Block until `tokens` are taken. Returns False if that would take longer than `timeout` seconds."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0.0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class RateLimitExceeded(RuntimeError):
+    """No request slot for the provider became free within the caller's time budget."""
+
+
+def is_throttled(outcome):
+    """True for an HTTP 429 response or an exception signalling one (e.g. Gemini's ResourceExhausted)."""
+    if getattr(outcome, "status_code", None) == 429:
+        return True
+    if isinstance(outcome, Exception):
+        return (
+            getattr(outcome, "code", None) == 429
+            or type(outcome).__name__ in ("ResourceExhausted", "TooManyRequests")
+            or "429" in str(outcome)
+        )
+    return False
+
+
+def _retry_after(outcome):
+    headers = getattr(outcome, "headers", None) or {}
+    try:
+        return min(float(headers.get("Retry-After", "")), MAX_BACKOFF)
+    except ValueError:
+        return None
+
+
+class AdaptiveRateLimiter:
+    """Client-side rate limit for one provider that backs off when the provider throttles.
+
+    Requests take a token from a bucket refilled at up to `rate` per second.
+    A throttled response halves the rate and pauses every caller for the
+    provider's Retry-After (or an exponential backoff); each success then
+    raises the rate by a twentieth of the configured maximum until it is back.
+    """
+
+    def __init__(self, name, rate, capacity=None, min_rate=None):
+        self.name = name
+        self.max_rate = float(rate)
+        self.min_rate = float(min_rate if min_rate is not None else self.max_rate / 16)
+        self.bucket = TokenBucket(rate, capacity)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "throttled": 0, "retries": 0, "rejected": 0}
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def configure(self, rate, capacity=None):
+        with self._lock:
+            self.max_rate = float(rate)
+            self.min_rate = min(self.min_rate, self.max_rate)
+            self.bucket.set_rate(rate, capacity)
+
+    def acquire(self, timeout=None):
+        """Wait out any backoff pause, then take a token. Returns False if `timeout` runs out first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            if deadline is not None and time.monotonic() + pause > deadline:
+                return False
+            time.sleep(pause)
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        return self.bucket.acquire(timeout=remaining)
+
+    def throttled(self, attempt=0, retry_after=None):
+        """Record a throttled response and return how long callers are paused."""
+        delay = retry_after if retry_after is not None else BACKOFF_BASE * (2 ** attempt) + random.uniform(0, BACKOFF_BASE)
+        with self._lock:
+            self.stats["throttled"] += 1
+            self.bucket.set_rate(max(self.min_rate, self.bucket.rate / 2))
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        logger.warning("%s throttled us; pausing %.1fs at %.2f req/s", self.name, delay, self.bucket.rate)
+        return delay
+
+    def succeeded(self):
+        if self.bucket.rate < self.max_rate:
+            with self._lock:
+                self.bucket.set_rate(min(self.max_rate, self.bucket.rate + self.max_rate / 20))
+
+    def call(self, fn, attempts=RETRY_ATTEMPTS, timeout=None):
+        """Run `fn()` under the limit, retrying throttled calls after backing off.
+
+        A throttled outcome (see `is_throttled`) is retried up to `attempts`
+        times in total; the last one is returned or raised as is. Raises
+        `RateLimitExceeded` if no slot frees up within `timeout` seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        attempts = max(1, attempts)
+        for attempt in range(attempts):
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not self.acquire(timeout=remaining):
+                self._count("rejected")
+                raise RateLimitExceeded(f"{self.name}: no request slot within {timeout:.1f}s")
+            self._count("calls")
+            if attempt:
+                self._count("retries")
+            try:
+                result = fn()
+            except Exception as e:
+                if not is_throttled(e) or attempt == attempts - 1:
+                    raise
+                self.throttled(attempt)
+                continue
+            if not is_throttled(result):
+                self.succeeded()
+                return result
+            if attempt == attempts - 1:
+                return result
+            self.throttled(attempt, _retry_after(result))
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider):
+    """Return the process-wide limiter for `provider`, configured from <PROVIDER>_RPM."""
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(provider)
+            if limiter is None:
+                rpm = float(os.getenv(f"{provider.upper()}_RPM", str(DEFAULT_RPM.get(provider, 300))))
+                # Allow a couple of seconds' worth of requests in one burst
+                limiter = _limiters[provider] = AdaptiveRateLimiter(provider, rpm / 60, capacity=max(1.0, rpm / 30))
+    return limiter
+
+
+def limiter_stats():
+    """Call, throttle and retry counts and the current rate (req/s) of each provider's limiter."""
+    return {name: dict(limiter.stats, rate=round(limiter.bucket.rate, 3)) for name, limiter in _limiters.items()}
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution shared by every caller."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """Return `(result, shared)`: `fn()`'s result, run once for all concurrent callers with `key`.
+
+        `shared` is True for callers that waited on another caller's run.
+        Exceptions are raised to every waiter.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result(), True
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
@@ -0,0 +1,167 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, TimeoutError, wait
+
+logger = logging.getLogger(__name__)
+
+# Consecutive failures that open a provider's circuit, and how long it stays open
+FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+LATENCY_WINDOW = 200
+MIN_SAMPLES = 20
+
+
+class CircuitOpen(RuntimeError):
+    """The provider's circuit is open, so the call was not attempted."""
+
+
+class CircuitBreaker:
+    """Stops calling a provider after repeated failures, then probes it before resuming.
+
+    Closed: calls go through, and `failure_threshold` failures in a row open
+    the circuit. Open: calls are refused for `reset_timeout` seconds.
+    Half-open: one trial call is let through; success closes the circuit and
+    failure opens it again.
+    """
+
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Return True if a call may go ahead now (taking the half-open trial slot if needed)."""
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._trial_running = False
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.info("%s circuit closed", self.name)
+            self.state = "closed"
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning("%s circuit opened after %d failures", self.name, self._failures)
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._trial_running = False
+
+    def release(self):
+        """Give back a half-open trial slot without judging the provider (e.g. the call never went out)."""
+        with self._lock:
+            self._trial_running = False
+
+    def call(self, fn, is_failure=lambda outcome: isinstance(outcome, Exception)):
+        """Run `fn()` if the circuit allows it, else raise `CircuitOpen`.
+
+        `is_failure` is given the result or the raised exception; exceptions
+        it does not count are re-raised without affecting the circuit.
+        """
+        if not self.allow():
+            raise CircuitOpen(f"{self.name} circuit is open")
+        try:
+            result = fn()
+        except Exception as e:
+            if is_failure(e):
+                self.record_failure()
+            else:
+                self.release()
+            raise
+        if is_failure(result):
+            self.record_failure()
+        else:
+            self.record_success()
+        return result
+
+
+class LatencyTracker:
+    """Recent latencies of successful calls, for picking a hedging delay."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct):
+        """The `pct` percentile of the recent latencies, or None until there are enough samples."""
+        with self._lock:
+            if len(self._samples) < MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def hedged_call(executor, fn, delay, may_hedge=lambda: True):
+    """Run `fn()` and, if it is still running after `delay` seconds, race a second `fn()` against it.
+
+    Returns `(result, hedged)` from whichever attempt succeeds first; `hedged`
+    is True when the second attempt won. If both fail, the last error is
+    raised. `may_hedge()` is asked before the second attempt is started. Only
+    use this for idempotent calls: the losing attempt is left to finish.
+    """
+    first = executor.submit(fn)
+    try:
+        return first.result(timeout=delay), False
+    except TimeoutError:
+        pass
+    if not may_hedge():
+        return first.result(), False
+
+    second = executor.submit(fn)
+    pending, error = {first, second}, None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result(), future is second
+            error = future.exception()
+    raise error
+
+
+_breakers = {}
+_trackers = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(provider):
+    """Return the process-wide circuit breaker for `provider`."""
+    with _registry_lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker(provider)
+        return _breakers[provider]
+
+
+def get_latency_tracker(provider):
+    with _registry_lock:
+        if provider not in _trackers:
+            _trackers[provider] = LatencyTracker()
+        return _trackers[provider]
+
+
+def breaker_states():
+    return {name: breaker.state for name, breaker in _breakers.items()}
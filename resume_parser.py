@@ -0,0 +1,318 @@
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import tracing
+
+logger = logging.getLogger(__name__)
+
+PDF_MIME = "application/pdf"
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+MEMO_SIZE = int(os.getenv("RESUME_MEMO_SIZE", "256"))
+# Optional second tier on disk; unset keeps parsed resumes in memory only
+DISK_CACHE_DIR = os.getenv("RESUME_CACHE_DIR", "")
+
+# Upload limits; pages past MAX_PAGES are ignored
+MAX_BYTES = int(os.getenv("RESUME_MAX_BYTES", str(10 * 1024 * 1024)))
+MAX_PAGES = int(os.getenv("RESUME_MAX_PAGES", "40"))
+PAGE_WORKERS = int(os.getenv("RESUME_PAGE_WORKERS", str(min(4, os.cpu_count() or 1))))
+PAGES_PER_TASK = 4
+NOT_A_RESUME = "Not a valid resume - document does not contain valid resume content"
+UNSUPPORTED_FORMAT = "Unsupported file format. Please upload a PDF or DOCX file."
+NO_SKILLS = "No skills found in resume"
+# Prefix of errors that a retry may not repeat; they are never memoized
+PROCESSING_ERROR = "Error processing file"
+
+# Skill extraction runs over chunks of the whole document, several at a time
+CHUNK_CHARS = int(os.getenv("RESUME_CHUNK_CHARS", "4000"))
+LLM_CONCURRENCY = int(os.getenv("RESUME_LLM_CONCURRENCY", "4"))
+
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+_page_pool = None
+_page_pool_lock = threading.Lock()
+_llm_executor = ThreadPoolExecutor(max_workers=LLM_CONCURRENCY, thread_name_prefix="resume-llm")
+
+
+def resume_digest(data, mime_type):
+    """Content hash identifying a resume regardless of its file name."""
+    return hashlib.sha256(mime_type.encode() + b"\0" + data).hexdigest()
+
+
+def _extract_page_range(data, start, stop):
+    """Extract the text of pages [start, stop) of a PDF. Runs in a worker process."""
+    from PyPDF2 import PdfReader
+
+    pdf = PdfReader(io.BytesIO(data))
+    return [(number, pdf.pages[number].extract_text() or "") for number in range(start, stop)]
+
+
+def _page_executor():
+    global _page_pool
+    if _page_pool is None:
+        with _page_pool_lock:
+            if _page_pool is None:
+                # spawn rather than fork: the Streamlit server is multi-threaded
+                _page_pool = ProcessPoolExecutor(
+                    max_workers=PAGE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+                )
+    return _page_pool
+
+
+def iter_pages(data, mime_type, max_pages=MAX_PAGES, workers=PAGE_WORKERS):
+    """Yield `(page_number, text)` for a PDF or DOCX resume as pages are extracted.
+
+    PDF pages are extracted in a process pool, a few pages per task, and are
+    yielded in completion order rather than document order. Pages beyond
+    `max_pages` are skipped. A DOCX document is yielded as a single page.
+    """
+    if mime_type == DOCX_MIME:
+        import docx
+
+        doc = docx.Document(io.BytesIO(data))
+        yield 0, "\n".join([para.text for para in doc.paragraphs])
+        return
+    if mime_type != PDF_MIME:
+        raise ValueError(f"Unsupported file type: {mime_type}")
+
+    from PyPDF2 import PdfReader
+
+    count = len(PdfReader(io.BytesIO(data)).pages)
+    if count > max_pages:
+        logger.warning("Resume has %d pages; only the first %d are read", count, max_pages)
+        count = max_pages
+    if workers <= 1 or count <= PAGES_PER_TASK:
+        yield from _extract_page_range(data, 0, count)
+        return
+
+    try:
+        executor = _page_executor()
+        futures = [
+            executor.submit(_extract_page_range, data, start, min(start + PAGES_PER_TASK, count))
+            for start in range(0, count, PAGES_PER_TASK)
+        ]
+    except (OSError, BrokenProcessPool) as e:
+        logger.warning("Page worker pool unavailable (%s); extracting in-process", e)
+        yield from _extract_page_range(data, 0, count)
+        return
+    try:
+        for future in as_completed(futures):
+            yield from future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def extract_text(data, mime_type, workers=PAGE_WORKERS):
+    """Extract plain text from PDF or DOCX bytes. Returns None for other formats."""
+    if mime_type not in (PDF_MIME, DOCX_MIME):
+        return None
+    pages = dict(iter_pages(data, mime_type, workers=workers))
+    return "\n".join(text for _, text in sorted(pages.items()) if text)
+
+
+def _looks_like_resume(text):
+    text = text.lower()
+    return "resume" in text or "cv" in text
+
+
+def _split_long(text):
+    """Split text longer than CHUNK_CHARS at line breaks (or hard limits)."""
+    while len(text) > CHUNK_CHARS:
+        cut = text.rfind("\n", 0, CHUNK_CHARS)
+        if cut <= 0:
+            cut = CHUNK_CHARS
+        yield text[:cut]
+        text = text[cut:].lstrip("\n")
+    if text:
+        yield text
+
+
+def _extract_chunk_skills(model, chunk):
+    prompt = f"""
+    Extract technical and professional skills from this resume text.
+    Format as a comma-separated list. If there are none, reply with an empty line.
+
+    Resume text:
+    {chunk}
+    """
+    response = model.generate_content(prompt)
+    return [skill.strip() for skill in response.text.strip().split(',')]
+
+
+def merge_skills(skill_lists):
+    """Merge per-chunk skill lists, dropping blanks and case-insensitive duplicates."""
+    merged, seen = [], set()
+    for skills in skill_lists:
+        for skill in skills:
+            skill = re.sub(r"\s+", " ", skill.strip(" \t\n-*•.;:")).strip()
+            key = skill.lower()
+            if skill and key not in seen:
+                seen.add(key)
+                merged.append(skill)
+    return merged
+
+
+@tracing.traced("resume.extract_skills")
+def _extract_skills(data, mime_type, model):
+    try:
+        if mime_type not in (PDF_MIME, DOCX_MIME):
+            return [], UNSUPPORTED_FORMAT
+        if len(data) > MAX_BYTES:
+            return [], f"{PROCESSING_ERROR}: files larger than {MAX_BYTES // (1024 * 1024)} MB are not supported"
+
+        # Map: as pages arrive, group them in document order into chunks and send
+        # each chunk to Gemini while the remaining pages are still being extracted.
+        # Chunks are only sent once the document is known to be a resume.
+        arrived, ordered = {}, []
+        chunk, chunk_len, fed = [], 0, 0
+        futures = []
+        valid = False
+
+        def submit_chunk():
+            nonlocal chunk, chunk_len
+            if chunk:
+                futures.append(tracing.submit(_llm_executor, _extract_chunk_skills, model, "\n".join(chunk)))
+                chunk, chunk_len = [], 0
+
+        for number, text in iter_pages(data, mime_type):
+            arrived[number] = text
+            valid = valid or _looks_like_resume(text)
+            while len(ordered) in arrived:
+                ordered.append(arrived.pop(len(ordered)))
+            while valid and fed < len(ordered):
+                for piece in _split_long(ordered[fed]):
+                    chunk.append(piece)
+                    chunk_len += len(piece)
+                    if chunk_len >= CHUNK_CHARS:
+                        submit_chunk()
+                fed += 1
+
+        # Check if document contains the word "resume" (case-insensitive)
+        if not valid:
+            return [], NOT_A_RESUME
+        submit_chunk()
+
+        outcomes = []
+        for future in futures:
+            try:
+                outcomes.append(future.result())
+            except Exception as e:
+                outcomes.append(e)
+        return _reduce_skills(outcomes, "\n".join(ordered))
+
+    except Exception as e:
+        return [], f"{PROCESSING_ERROR}: {str(e)}"
+
+
+def _reduce_skills(outcomes, text):
+    """Merge per-chunk skill lists (or the exceptions that replaced them), tolerating individual chunk failures."""
+    results = [outcome for outcome in outcomes if not isinstance(outcome, Exception)]
+    errors = [outcome for outcome in outcomes if isinstance(outcome, Exception)]
+    if errors:
+        if not results:
+            raise errors[0]
+        logger.warning("%d of %d resume chunks failed skill extraction: %s", len(errors), len(outcomes), errors[0])
+    skills = merge_skills(results)
+
+    if not skills:
+        # Fallback method if AI extraction fails
+        skills = [line.strip() for line in text.split("\n") if "skill" in line.lower()]
+
+    return (skills, None) if skills else ([], NO_SKILLS)
+
+
+def skills_from_text(text, model):
+    """Extract skills from already-extracted resume text, one chunk after another.
+
+    Returns `(skills, error)` like `extract_skills_from_resume`. Meant
+    for callers that parallelize across resumes rather than within one.
+    """
+    try:
+        if not _looks_like_resume(text):
+            return [], NOT_A_RESUME
+        outcomes = []
+        for chunk in _split_long(text):
+            try:
+                outcomes.append(_extract_chunk_skills(model, chunk))
+            except Exception as e:
+                outcomes.append(e)
+        return _reduce_skills(outcomes, text)
+    except Exception as e:
+        return [], f"{PROCESSING_ERROR}: {str(e)}"
+
+
+def _disk_path(digest):
+    # ".v2": entries hold {"skills", "error"}; older ones held the messages in the skill list
+    return os.path.join(DISK_CACHE_DIR, f"{digest}.v2.json")
+
+
+def _load_from_disk(digest):
+    if not DISK_CACHE_DIR:
+        return None
+    try:
+        with open(_disk_path(digest), encoding="utf-8") as f:
+            entry = json.load(f)
+        return entry["skills"], entry["error"]
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning("Ignoring unreadable resume cache entry %s: %s", digest, e)
+        return None
+
+
+def _save_to_disk(digest, result):
+    if not DISK_CACHE_DIR:
+        return
+    try:
+        os.makedirs(DISK_CACHE_DIR, exist_ok=True)
+        tmp_path = _disk_path(digest) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"skills": result[0], "error": result[1]}, f)
+        os.replace(tmp_path, _disk_path(digest))
+    except OSError as e:
+        logger.warning("Could not write resume cache entry %s: %s", digest, e)
+
+
+def _remember(digest, result):
+    with _memo_lock:
+        _memo[digest] = result
+        _memo.move_to_end(digest)
+        while len(_memo) > MEMO_SIZE:
+            _memo.popitem(last=False)
+
+
+def extract_skills_from_resume(data, mime_type, model):
+    """Return `(skills, error)` for a resume, parsing and calling the LLM once per file.
+
+    `error` is None on success; otherwise it is a message for the user (such
+    as NOT_A_RESUME or NO_SKILLS) and `skills` is empty. Results are memoized
+    by a hash of the file contents, first in process memory and then, if
+    RESUME_CACHE_DIR is set, on disk. Processing errors are not memoized so a
+    retry can succeed.
+    """
+    digest = resume_digest(data, mime_type)
+    with _memo_lock:
+        if digest in _memo:
+            _memo.move_to_end(digest)
+            skills, error = _memo[digest]
+            return list(skills), error
+
+    result = _load_from_disk(digest)
+    if result is None:
+        result = _extract_skills(data, mime_type, model)
+        if result[1] is not None and result[1].startswith(PROCESSING_ERROR):
+            return result
+        _save_to_disk(digest, result)
+
+    _remember(digest, result)
+    return list(result[0]), result[1]
@@ -0,0 +1,143 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import tracing
+from embeddings import DIMENSION, embed_text, tokenize
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "1") == "1"
+# Cosine similarity a new question needs with a cached one to reuse its answer
+THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.8"))
+TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2000"))
+CANDIDATES = 8
+
+# Words that phrase a question rather than name its subject. Whatever else a
+# question mentions (skills, fields, job titles) has to match exactly: the
+# embedding alone rates "php developers" close to "python developers".
+_PHRASING_WORDS = frozenset("""
+    a an the and or of for to in on at with about as by from into is are was be been being am
+    do does did can could should would will may might must i me my we our you your it its
+    this that these those there what which who how why when where whats
+    get become becoming start starting transition switch move learn learning
+    want like know tell give please help need needed require required requirement
+    good best better top most more some any all
+    career path job role skill
+""".split())
+
+
+def subject_terms(question):
+    """The words of a question that say what it is about, singularized, as a set."""
+    terms = set()
+    for token in tokenize(question):
+        token = token.rstrip(".")
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        if token and token not in _PHRASING_WORDS:
+            terms.add(token)
+    return frozenset(terms)
+
+
+class SemanticCache:
+    """Answers to previous questions, looked up by embedding similarity.
+
+    Questions are embedded with the hashing vectorizer from embeddings.py and
+    stored in an in-memory FAISS inner-product index, so rewordings that share
+    most of their words and word fragments match, provided they name the same
+    subject (see `subject_terms`). Entries expire after `ttl`
+    seconds and the oldest are evicted beyond `max_entries`. A `namespace`
+    keeps answers that depend on other context (such as resume skills) apart.
+    """
+
+    def __init__(self, threshold=THRESHOLD, ttl=TTL, max_entries=MAX_ENTRIES):
+        import faiss
+
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(DIMENSION))
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+    def _remove(self, ids):
+        if ids:
+            self._index.remove_ids(np.array(ids, dtype=np.int64))
+            for entry_id in ids:
+                self._entries.pop(entry_id, None)
+
+    @tracing.traced("semantic_cache.lookup")
+    def lookup(self, question, namespace=""):
+        """Return the cached value for the most similar question about the same subject, or None."""
+        vector = embed_text(question).reshape(1, -1)
+        subject = subject_terms(question)
+        now = time.time()
+        with self._lock:
+            if self._index.ntotal == 0:
+                self._stats["misses"] += 1
+                return None
+            scores, ids = self._index.search(vector, min(CANDIDATES, self._index.ntotal))
+            expired = []
+            for score, entry_id in zip(scores[0], ids[0]):
+                entry = self._entries.get(int(entry_id))
+                if entry is None or score < self.threshold:
+                    continue
+                if entry["expires_at"] <= now:
+                    expired.append(int(entry_id))
+                    continue
+                if entry["namespace"] == namespace and entry["subject"] == subject:
+                    self._stats["hits"] += 1
+                    self._remove(expired)
+                    self._stats["expired"] += len(expired)
+                    logger.info("Semantic cache hit (%.3f) for %r via %r", score, question, entry["question"])
+                    return entry["value"]
+            self._remove(expired)
+            self._stats["expired"] += len(expired)
+            self._stats["misses"] += 1
+            return None
+
+    def store(self, question, value, namespace=""):
+        vector = embed_text(question).reshape(1, -1)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(vector, np.array([entry_id], dtype=np.int64))
+            self._entries[entry_id] = {
+                "question": question,
+                "namespace": namespace,
+                "subject": subject_terms(question),
+                "value": value,
+                "expires_at": time.time() + self.ttl,
+            }
+            overflow = len(self._entries) - self.max_entries
+            if overflow > 0:
+                self._remove(list(self._entries)[:overflow])
+                self._stats["evictions"] += overflow
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries))
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_semantic_cache():
+    """Return the process-wide semantic cache, or None when it is disabled."""
+    global _cache
+    if _cache is None and ENABLED:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SemanticCache()
+    return _cache
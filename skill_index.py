@@ -0,0 +1,304 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import faiss
+import numpy as np
+
+from embeddings import DIMENSION, embed_skills
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIR = os.getenv("SKILL_INDEX_DIR", os.path.join(".cache", "skill_index"))
+# "flat" scans every vector and suits small corpora; "ivf" and "hnsw" are approximate
+# and keep queries fast at hundreds of thousands of profiles.
+INDEX_TYPE = os.getenv("SKILL_INDEX_TYPE", "flat")
+IVF_NLIST = int(os.getenv("SKILL_INDEX_IVF_NLIST", "1024"))
+IVF_NPROBE = int(os.getenv("SKILL_INDEX_IVF_NPROBE", "16"))
+HNSW_M = int(os.getenv("SKILL_INDEX_HNSW_M", "32"))
+HNSW_EF_SEARCH = int(os.getenv("SKILL_INDEX_HNSW_EF_SEARCH", "64"))
+SAVE_INTERVAL = float(os.getenv("SKILL_INDEX_SAVE_INTERVAL", "30"))
+SYNC_INTERVAL = 5.0
+EMBED_BATCH = 4096
+
+
+def _fingerprint(skills):
+    normalized = sorted({str(s).strip().lower() for s in skills if str(s).strip()})
+    return hashlib.sha256("\n".join(normalized).encode("utf-8")).hexdigest()
+
+
+class SkillIndex:
+    """Persistent nearest-neighbour index over stored skill profiles.
+
+    Profiles live in a SQLite table, which is the source of truth. The FAISS
+    index is saved next to it and loaded memory-mapped on startup; rows added
+    since the last save (by this or any other process) are embedded and
+    appended incrementally, so startup never rebuilds the whole index.
+    """
+
+    def __init__(self, directory=INDEX_DIR, index_type=INDEX_TYPE):
+        if index_type not in ("flat", "ivf", "hnsw"):
+            raise ValueError(f"Unknown skill index type: {index_type!r}")
+        self.directory = directory
+        self.index_type = index_type
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._index = None
+        self._built_type = None
+        self._mmapped = False
+        self._max_id = 0
+        self._dirty = False
+        self._last_save = time.time()
+        self._last_sync = 0.0
+        self._rebuild_lock = threading.Lock()
+        self._rebuilding = False
+
+        os.makedirs(directory, exist_ok=True)
+        self._db().execute(
+            """
+            CREATE TABLE IF NOT EXISTS profiles (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                fingerprint TEXT NOT NULL UNIQUE,
+                label TEXT NOT NULL,
+                skills TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._load()
+        self._sync(force=True)
+
+    def _db(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.directory, "profiles.sqlite3"), timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    # -- index construction -------------------------------------------------
+
+    def _new_index(self, index_type):
+        if index_type == "hnsw":
+            hnsw = faiss.IndexHNSWFlat(DIMENSION, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            return faiss.IndexIDMap2(hnsw)
+        if index_type == "ivf":
+            quantizer = faiss.IndexFlatIP(DIMENSION)
+            return faiss.IndexIVFFlat(quantizer, DIMENSION, IVF_NLIST, faiss.METRIC_INNER_PRODUCT)
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(DIMENSION))
+
+    def _tune(self):
+        if self._built_type == "ivf":
+            self._index.nprobe = IVF_NPROBE
+        elif self._built_type == "hnsw":
+            faiss.downcast_index(self._index.index).hnsw.efSearch = HNSW_EF_SEARCH
+
+    def _target_type(self, count):
+        # IVF needs enough vectors to train its coarse quantizer; stay flat until then
+        if self.index_type == "ivf" and count < IVF_NLIST * 39:
+            return "flat"
+        return self.index_type
+
+    def _iter_rows(self, after_id=0):
+        cursor = self._db().execute(
+            "SELECT id, skills FROM profiles WHERE id > ? ORDER BY id", (after_id,)
+        )
+        while True:
+            rows = cursor.fetchmany(EMBED_BATCH)
+            if not rows:
+                return
+            ids = np.array([row[0] for row in rows], dtype=np.int64)
+            vectors = np.vstack([embed_skills(json.loads(row[1])) for row in rows]).astype(np.float32)
+            yield ids, vectors
+
+    def rebuild(self):
+        """Rebuild the index from every stored profile and save it.
+
+        The new index is built without holding the lock, so searches and
+        additions continue on the old one; profiles added meanwhile are
+        appended before it replaces the old index.
+        """
+        with self._rebuild_lock:
+            (count,) = self._db().execute("SELECT COUNT(*) FROM profiles").fetchone()
+            built_type = self._target_type(count)
+            index = self._new_index(built_type)
+            if built_type == "ivf":
+                sample = self._db().execute(
+                    "SELECT skills FROM profiles ORDER BY RANDOM() LIMIT ?", (IVF_NLIST * 64,)
+                ).fetchall()
+                index.train(np.vstack([embed_skills(json.loads(row[0])) for row in sample]))
+
+            max_id = 0
+            for ids, vectors in self._iter_rows():
+                index.add_with_ids(vectors, ids)
+                max_id = int(ids[-1])
+
+            with self._lock:
+                for ids, vectors in self._iter_rows(max_id):
+                    index.add_with_ids(vectors, ids)
+                    max_id = int(ids[-1])
+                self._index, self._built_type, self._mmapped = index, built_type, False
+                self._max_id = max_id
+                self._tune()
+                self._dirty = True
+                self.save()
+
+    # -- persistence ----------------------------------------------------------
+
+    def _state_path(self):
+        return os.path.join(self.directory, "state.json")
+
+    def _load(self):
+        try:
+            with open(self._state_path(), encoding="utf-8") as f:
+                state = json.load(f)
+            path = os.path.join(self.directory, state["file"])
+            index = faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except FileNotFoundError:
+            self._index, self._built_type = self._new_index("flat"), "flat"
+            return
+        except (OSError, ValueError, KeyError, RuntimeError) as e:
+            logger.warning("Skill index unreadable (%s); rebuilding from stored profiles", e)
+            self.rebuild()
+            return
+
+        self._index, self._built_type = index, state["type"]
+        self._mmapped = True
+        self._max_id = state["max_id"]
+        self._tune()
+
+    def _ensure_writable(self):
+        # Memory-mapped IVF lists are read-only; load a private copy of the latest save first
+        if self._mmapped and self._built_type == "ivf":
+            with open(self._state_path(), encoding="utf-8") as f:
+                state = json.load(f)
+            self._index = faiss.read_index(os.path.join(self.directory, state["file"]))
+            self._built_type, self._max_id = state["type"], state["max_id"]
+            self._tune()
+        self._mmapped = False
+
+    def save(self):
+        """Write the index to disk if it has changed since the last save."""
+        with self._lock:
+            if not self._dirty:
+                return
+            name = f"index.{self._max_id}.faiss"
+            tmp_path = os.path.join(self.directory, f"{name}.{os.getpid()}.tmp")
+            faiss.write_index(self._index, tmp_path)
+            os.replace(tmp_path, os.path.join(self.directory, name))
+
+            # state.json is the commit point; older index files are only removed after it moves
+            state_tmp = f"{self._state_path()}.{os.getpid()}.tmp"
+            with open(state_tmp, "w", encoding="utf-8") as f:
+                json.dump({"file": name, "type": self._built_type, "max_id": self._max_id}, f)
+            os.replace(state_tmp, self._state_path())
+            for entry in os.listdir(self.directory):
+                if entry.startswith("index.") and entry.endswith(".faiss") and entry != name:
+                    try:
+                        os.remove(os.path.join(self.directory, entry))
+                    except OSError:
+                        pass
+            self._dirty = False
+            self._last_save = time.time()
+
+    def _maybe_save(self):
+        if self._dirty and time.time() - self._last_save >= SAVE_INTERVAL:
+            self.save()
+
+    def _sync(self, force=False):
+        """Append profiles stored since the index was last brought up to date."""
+        now = time.time()
+        if not force and now - self._last_sync < SYNC_INTERVAL:
+            return
+        with self._lock:
+            self._last_sync = now
+            (newest,) = self._db().execute("SELECT MAX(id) FROM profiles").fetchone()
+            if not newest or newest <= self._max_id:
+                return
+            self._ensure_writable()
+            for ids, vectors in self._iter_rows(self._max_id):
+                self._index.add_with_ids(vectors, ids)
+                self._max_id = int(ids[-1])
+                self._dirty = True
+            if self._built_type != self._target_type(self._index.ntotal) and not self._rebuilding:
+                logger.info("Rebuilding skill index as %s in the background", self._target_type(self._index.ntotal))
+                self._rebuilding = True
+                threading.Thread(target=self._rebuild_in_background, name="skill-index-rebuild", daemon=True).start()
+
+    def _rebuild_in_background(self):
+        try:
+            self.rebuild()
+        except Exception as e:
+            logger.warning("Skill index rebuild failed; keeping the current index: %s", e)
+        finally:
+            self._rebuilding = False
+
+    # -- public API -----------------------------------------------------------
+
+    def __len__(self):
+        return self._index.ntotal
+
+    def add_profile(self, skills, label=""):
+        """Store a skill profile and return its id. Re-adding the same skills is a no-op."""
+        fingerprint = _fingerprint(skills)
+        conn = self._db()
+        conn.execute(
+            "INSERT OR IGNORE INTO profiles (fingerprint, label, skills, created_at) VALUES (?, ?, ?, ?)",
+            (fingerprint, label, json.dumps(list(skills)), time.time()),
+        )
+        (profile_id,) = conn.execute(
+            "SELECT id FROM profiles WHERE fingerprint = ?", (fingerprint,)
+        ).fetchone()
+        self._sync(force=True)
+        self._maybe_save()
+        return profile_id
+
+    def search(self, skills, k=5):
+        """Return up to `k` stored profiles closest to `skills`, best first.
+
+        Each result is a dict with "id", "label", "skills" and a cosine "score".
+        """
+        self._sync()
+        query = embed_skills(skills).reshape(1, -1).astype(np.float32)
+        with self._lock:
+            if self._index.ntotal == 0:
+                return []
+            scores, ids = self._index.search(query, k)
+
+        hits = [(int(i), float(s)) for i, s in zip(ids[0], scores[0]) if i >= 0]
+        if not hits:
+            return []
+        placeholders = ",".join("?" * len(hits))
+        rows = self._db().execute(
+            f"SELECT id, label, skills FROM profiles WHERE id IN ({placeholders})",
+            [i for i, _ in hits],
+        ).fetchall()
+        profiles = {row[0]: row for row in rows}
+        return [
+            {"id": i, "label": profiles[i][1], "skills": json.loads(profiles[i][2]), "score": score}
+            for i, score in hits if i in profiles
+        ]
+
+    def search_text(self, text, k=5):
+        """Like `search`, but for free text such as a job description."""
+        return self.search([text], k)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_skill_index():
+    """Return the process-wide skill index, loading it on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SkillIndex()
+                atexit.register(_index.save)
+    return _index
@@ -0,0 +1,246 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from typing import Callable, NamedTuple, Tuple
+
+import tracing
+
+logger = logging.getLogger(__name__)
+
+WORKERS = int(os.getenv("STAGE_WORKERS", "32"))
+# Stage outputs remembered per graph, keyed by stage and turn input
+MEMO_SIZE = int(os.getenv("STAGE_MEMO_SIZE", "512"))
+
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="stage")
+
+
+class Stage(NamedTuple):
+    """One step of a turn.
+
+    `fn(run, *results)` is called with the `StageRun` and the results of
+    `deps`, in order. `memoize` is False, True, or a predicate on the result
+    saying whether it may be reused for the same input.
+    """
+
+    name: str
+    fn: Callable
+    deps: Tuple[str, ...] = ()
+    memoize: object = False
+
+
+class StageGraph:
+    """A set of stages with declared dependencies, run concurrently by `start`.
+
+    Each stage starts as soon as the stages it depends on have finished, so a
+    run takes as long as its critical path. Memoized stages reuse their result
+    for the same `memo_key` across runs (bounded LRU, per graph).
+    """
+
+    def __init__(self, stages, memo_size=MEMO_SIZE):
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            missing = [dep for dep in stage.deps if dep not in self.stages]
+            if missing:
+                raise ValueError(f"stage {stage.name!r} depends on unknown stages {missing}")
+        self._check_acyclic()
+        self.memo_size = memo_size
+        self._memo = OrderedDict()
+        self._memo_lock = threading.Lock()
+
+    def _check_acyclic(self):
+        state = {}
+
+        def visit(name, path):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"stage cycle: {' -> '.join(path + [name])}")
+            state[name] = "visiting"
+            for dep in self.stages[name].deps:
+                visit(dep, path + [name])
+            state[name] = "done"
+
+        for name in self.stages:
+            visit(name, [])
+
+    def required(self, targets):
+        """The names of `targets` and every stage they depend on."""
+        needed, todo = set(), list(targets)
+        while todo:
+            name = todo.pop()
+            if name not in needed:
+                needed.add(name)
+                todo.extend(self.stages[name].deps)
+        return needed
+
+    def memo_get(self, name, key):
+        with self._memo_lock:
+            if (name, key) in self._memo:
+                self._memo.move_to_end((name, key))
+                return True, self._memo[(name, key)]
+        return False, None
+
+    def memo_set(self, name, key, value):
+        with self._memo_lock:
+            self._memo[(name, key)] = value
+            self._memo.move_to_end((name, key))
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+
+    def start(self, inputs, targets=None, memo_key=None, executor=None):
+        """Start the stages needed for `targets` (default: all) and return the `StageRun`.
+
+        `inputs` is available to stage functions as `run.inputs`. Memoization
+        applies only when a `memo_key` identifying the input is given.
+        """
+        run = StageRun(self, inputs, self.required(targets or self.stages), memo_key, executor or _executor)
+        run._schedule()
+        return run
+
+
+class StageRun:
+    """One execution of a `StageGraph`: a future per stage, plus partial results published while stages run."""
+
+    def __init__(self, graph, inputs, names, memo_key, executor):
+        self.graph = graph
+        self.inputs = inputs
+        self.memo_key = memo_key
+        self.futures = {name: Future() for name in names}
+        self._executor = executor
+        self._started = set()
+        self._partials = {}
+        self._changed = threading.Condition()
+        # Stages run in the caller's trace context wherever they are scheduled from
+        self._context = contextvars.copy_context()
+
+    def _notify(self):
+        with self._changed:
+            self._changed.notify_all()
+
+    def _schedule(self):
+        ready = []
+        with self._changed:
+            for name, future in self.futures.items():
+                if name in self._started:
+                    continue
+                deps = [self.futures[dep] for dep in self.graph.stages[name].deps]
+                if future.done():
+                    # Resolved from outside before it could run
+                    self._started.add(name)
+                elif all(dep.done() for dep in deps):
+                    self._started.add(name)
+                    ready.append((name, deps))
+        for name, deps in ready:
+            if any(dep.cancelled() for dep in deps):
+                self.futures[name].cancel()
+                continue
+            failed = next((dep.exception() for dep in deps if dep.exception() is not None), None)
+            if failed is not None:
+                self._settle(name, error=failed)
+                continue
+            results = [dep.result() for dep in deps]
+            hit, value = self.graph.memo_get(name, self.memo_key) if self._memoized(name) else (False, None)
+            if hit:
+                self._settle(name, value)
+            else:
+                self._executor.submit(self._context.copy().run, self._run_stage, name, results)
+
+    def _memoized(self, name):
+        return self.memo_key is not None and self.graph.stages[name].memoize is not False
+
+    def _run_stage(self, name, results):
+        stage = self.graph.stages[name]
+        if self.futures[name].done():
+            return
+        try:
+            with tracing.span(f"stage.{name}"):
+                value = stage.fn(self, *results)
+        except Exception as e:
+            self._settle(name, error=e)
+            return
+        if self._memoized(name) and (stage.memoize is True or stage.memoize(value)):
+            self.graph.memo_set(name, self.memo_key, value)
+        self._settle(name, value)
+
+    def _settle(self, name, value=None, error=None):
+        future = self.futures[name]
+        try:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(value)
+        except InvalidStateError:
+            # Already resolved early or cancelled
+            return
+        self._notify()
+        self._schedule()
+
+    def resolve(self, name, value):
+        """Complete stage `name` with `value` now, e.g. a keyword read from a partial reply.
+
+        Dependent stages start at once; the stage's own function is skipped if
+        it has not started, and its later result is ignored if it has.
+        """
+        if name in self.futures:
+            self._settle(name, value)
+
+    def publish(self, name, value):
+        """Report a partial result of a running stage to `events` consumers."""
+        with self._changed:
+            self._partials[name] = value
+            self._changed.notify_all()
+
+    def result(self, name, timeout=None):
+        return self.futures[name].result(timeout)
+
+    def cancel(self):
+        """Stop the run: stages not started yet are skipped and results still to come are dropped."""
+        for future in self.futures.values():
+            future.cancel()
+        self._notify()
+
+    def events(self, names, timeout=None):
+        """Yield `(name, value, done)` for `names` as partial results are published and stages finish.
+
+        Finished stages are reported once with `done=True`; a failed stage
+        raises its exception. Stages still running after `timeout` seconds are
+        left behind and logged.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        pending = [name for name in names if name in self.futures]
+        seen = {}
+        while pending:
+            with self._changed:
+                ready = self._ready(pending, seen)
+                while not ready:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        logger.warning("Stages %s missed the %.1fs deadline", pending, timeout)
+                        return
+                    self._changed.wait(remaining)
+                    ready = self._ready(pending, seen)
+            for name, future in ready:
+                if future is None:
+                    yield name, self._partials[name], False
+                    continue
+                pending.remove(name)
+                if future.cancelled():
+                    continue
+                if future.exception() is not None:
+                    raise future.exception()
+                yield name, future.result(), True
+
+    def _ready(self, pending, seen):
+        ready = []
+        for name in pending:
+            future = self.futures[name]
+            if future.done():
+                ready.append((name, future))
+            elif name in self._partials and seen.get(name) is not self._partials[name]:
+                seen[name] = self._partials[name]
+                ready.append((name, None))
+        return ready
@@ -0,0 +1,143 @@
+import threading
+import time
+
+import pytest
+
+import ratelimit
+
+WAIT = 5
+
+
+class Response:
+    def __init__(self, status_code, retry_after=None):
+        self.status_code = status_code
+        self.headers = {} if retry_after is None else {"Retry-After": str(retry_after)}
+
+
+def replies(*outcomes):
+    """A call returning (or raising) `outcomes` in turn, counting how often it ran."""
+    pending = list(outcomes)
+
+    def call():
+        call.count += 1
+        outcome = pending.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    call.count = 0
+    return call
+
+
+def test_429_is_retried_after_retry_after_within_the_deadline():
+    limiter = ratelimit.AdaptiveRateLimiter("test", rate=100)
+    call = replies(Response(429, retry_after=0.05), Response(200))
+
+    started = time.monotonic()
+    assert limiter.call(call, attempts=3, timeout=WAIT).status_code == 200
+    assert 0.05 <= time.monotonic() - started < WAIT
+    assert call.count == 2
+    assert limiter.stats["throttled"] == 1 and limiter.stats["retries"] == 1
+    # The throttle halved the rate; the success took a step back up
+    assert limiter.bucket.rate == pytest.approx(100 / 2 + 100 / 20)
+
+
+def test_retry_after_past_the_deadline_fails_fast():
+    limiter = ratelimit.AdaptiveRateLimiter("test", rate=100)
+    call = replies(Response(429, retry_after=10), Response(200))
+
+    started = time.monotonic()
+    with pytest.raises(ratelimit.RateLimitExceeded):
+        limiter.call(call, attempts=3, timeout=0.2)
+    assert time.monotonic() - started < 1
+    assert call.count == 1
+    assert limiter.stats["rejected"] == 1
+
+
+def test_throttled_exceptions_back_off_and_the_last_attempt_is_raised(monkeypatch):
+    monkeypatch.setattr(ratelimit, "BACKOFF_BASE", 0.01)
+    limiter = ratelimit.AdaptiveRateLimiter("test", rate=100)
+    call = replies(RuntimeError("429 Resource has been exhausted"), RuntimeError("429 again"))
+
+    with pytest.raises(RuntimeError, match="429 again"):
+        limiter.call(call, attempts=2, timeout=WAIT)
+    assert call.count == 2
+
+
+def test_other_errors_are_not_retried():
+    limiter = ratelimit.AdaptiveRateLimiter("test", rate=100)
+    call = replies(ValueError("bad request"), Response(200))
+
+    with pytest.raises(ValueError):
+        limiter.call(call, attempts=3, timeout=WAIT)
+    assert call.count == 1
+
+
+def test_last_throttled_response_is_returned():
+    limiter = ratelimit.AdaptiveRateLimiter("test", rate=100)
+    call = replies(Response(429, retry_after=0), Response(429, retry_after=0))
+
+    assert limiter.call(call, attempts=2, timeout=WAIT).status_code == 429
+    assert call.count == 2
+
+
+def test_empty_bucket_rejects_without_waiting_past_the_timeout():
+    limiter = ratelimit.AdaptiveRateLimiter("test", rate=1, capacity=1)
+    limiter.call(lambda: Response(200), timeout=0)
+
+    with pytest.raises(ratelimit.RateLimitExceeded):
+        limiter.call(lambda: Response(200), timeout=0)
+
+
+def test_single_flight_shares_one_run_between_concurrent_callers():
+    flights, started, release = ratelimit.SingleFlight(), threading.Event(), threading.Event()
+    runs, results = [], []
+
+    def fetch():
+        runs.append(1)
+        started.set()
+        release.wait(WAIT)
+        return "jobs"
+
+    leader = threading.Thread(target=lambda: results.append(flights.do("python", fetch)))
+    leader.start()
+    assert started.wait(WAIT)
+    follower = threading.Thread(target=lambda: results.append(flights.do("python", fetch)))
+    follower.start()
+    # Give the follower time to join the flight before it lands
+    time.sleep(0.05)
+    release.set()
+    leader.join(WAIT)
+    follower.join(WAIT)
+
+    assert runs == [1]
+    assert sorted(results) == [("jobs", False), ("jobs", True)]
+    # Once done, the key is free for a fresh run
+    assert flights.do("python", lambda: "again") == ("again", False)
+
+
+def test_single_flight_raises_the_error_to_every_waiter():
+    flights, started, release, errors = ratelimit.SingleFlight(), threading.Event(), threading.Event(), []
+
+    def fetch():
+        started.set()
+        release.wait(WAIT)
+        raise ConnectionError("down")
+
+    def caller():
+        try:
+            flights.do("python", fetch)
+        except ConnectionError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=caller)]
+    threads[0].start()
+    assert started.wait(WAIT)
+    threads.append(threading.Thread(target=caller))
+    threads[1].start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(WAIT)
+
+    assert len(errors) == 2
@@ -0,0 +1,129 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import resilience
+
+WAIT = 5
+
+
+def down():
+    raise ConnectionError("down")
+
+
+def opened(reset_timeout=0.05):
+    breaker = resilience.CircuitBreaker("test", failure_threshold=2, reset_timeout=reset_timeout)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    return breaker
+
+
+def test_failures_open_the_circuit_until_the_reset_timeout():
+    breaker = opened()
+    assert not breaker.allow()
+    with pytest.raises(resilience.CircuitOpen):
+        breaker.call(lambda: "never")
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+
+
+def test_half_open_lets_one_trial_through_until_it_is_released():
+    breaker = opened()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.release()
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+
+def test_trial_outcome_closes_or_reopens_the_circuit():
+    breaker = opened()
+    time.sleep(0.06)
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == "closed"
+
+    breaker = opened()
+    time.sleep(0.06)
+    with pytest.raises(ConnectionError):
+        breaker.call(down)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_uncounted_errors_release_the_trial_without_judging_the_provider():
+    breaker = opened()
+    time.sleep(0.06)
+
+    def never_sent():
+        raise LookupError("no request slot")
+
+    with pytest.raises(LookupError):
+        breaker.call(never_sent, is_failure=lambda outcome: not isinstance(outcome, LookupError))
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+
+def test_failed_results_count_like_errors():
+    breaker = resilience.CircuitBreaker("test", failure_threshold=2, reset_timeout=WAIT)
+    for _ in range(2):
+        assert breaker.call(lambda: 503, is_failure=lambda outcome: outcome == 503) == 503
+    assert breaker.state == "open"
+
+
+def test_hedged_call_returns_a_fast_first_attempt_without_hedging():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert resilience.hedged_call(executor, lambda: "first", delay=WAIT) == ("first", False)
+
+
+def test_hedged_call_races_a_second_attempt_against_a_slow_first():
+    release, attempts = threading.Event(), []
+
+    def fetch():
+        attempts.append(1)
+        if len(attempts) == 1:
+            release.wait(WAIT)
+            return "slow"
+        return "fast"
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        try:
+            assert resilience.hedged_call(executor, fetch, delay=0.02) == ("fast", True)
+        finally:
+            release.set()
+
+
+def test_hedged_call_waits_for_the_first_attempt_when_hedging_is_refused():
+    attempts = []
+
+    def fetch():
+        attempts.append(1)
+        time.sleep(0.05)
+        return "only"
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert resilience.hedged_call(executor, fetch, delay=0.01, may_hedge=lambda: False) == ("only", False)
+    assert attempts == [1]
+
+
+def test_hedged_call_raises_when_both_attempts_fail():
+    def fetch():
+        time.sleep(0.03)
+        raise ConnectionError("down")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        with pytest.raises(ConnectionError):
+            resilience.hedged_call(executor, fetch, delay=0.01)
+
+
+def test_latency_percentile_needs_enough_samples():
+    tracker = resilience.LatencyTracker()
+    for i in range(resilience.MIN_SAMPLES - 1):
+        tracker.record(i / 100)
+    assert tracker.percentile(95) is None
+    tracker.record(1.0)
+    assert tracker.percentile(95) == 1.0
@@ -0,0 +1,155 @@
+import threading
+
+import pytest
+
+import stages
+
+WAIT = 5
+
+
+def graph(*stage_list):
+    return stages.StageGraph(list(stage_list))
+
+
+def test_resolve_early_starts_dependents_while_the_stage_runs():
+    release, seen = threading.Event(), []
+
+    def keyword(run):
+        run.resolve("keyword", "python")
+        release.wait(WAIT)
+        return "late"
+
+    def lookup(run, value):
+        seen.append(value)
+        release.set()
+        return value.upper()
+
+    run = graph(
+        stages.Stage("keyword", keyword),
+        stages.Stage("lookup", lookup, ("keyword",)),
+    ).start({})
+
+    assert run.result("lookup", WAIT) == "PYTHON"
+    assert seen == ["python"]
+    # The stage's own result arrives after the early one and is ignored
+    assert run.result("keyword", WAIT) == "python"
+
+
+def test_resolve_before_the_stage_starts_skips_it():
+    gate, calls = threading.Event(), []
+
+    def slow(run):
+        gate.wait(WAIT)
+        return 1
+
+    def keyword(run, _):
+        calls.append("keyword")
+        return "from stage"
+
+    run = graph(
+        stages.Stage("slow", slow),
+        stages.Stage("keyword", keyword, ("slow",)),
+        stages.Stage("lookup", lambda run, value: value, ("keyword",)),
+    ).start({})
+    run.resolve("keyword", "early")
+    assert run.result("lookup", WAIT) == "early"
+    gate.set()
+    assert run.result("slow", WAIT) == 1
+    assert calls == []
+
+
+def test_cancel_skips_dependents_of_a_running_stage():
+    started, release, calls = threading.Event(), threading.Event(), []
+
+    def first(run):
+        started.set()
+        release.wait(WAIT)
+        return 1
+
+    run = graph(
+        stages.Stage("first", first),
+        stages.Stage("second", lambda run, value: calls.append("second"), ("first",)),
+        stages.Stage("third", lambda run, value: calls.append("third"), ("second",)),
+    ).start({})
+    assert started.wait(WAIT)
+    run.cancel()
+    release.set()
+
+    assert list(run.events(["first", "second", "third"], timeout=WAIT)) == []
+    assert all(future.cancelled() for future in run.futures.values())
+    assert calls == []
+
+
+def test_failure_reaches_dependents_and_events():
+    def broken(run):
+        raise ValueError("no keyword")
+
+    run = graph(
+        stages.Stage("keyword", broken),
+        stages.Stage("lookup", lambda run, value: value, ("keyword",)),
+    ).start({})
+    with pytest.raises(ValueError):
+        run.result("lookup", WAIT)
+    with pytest.raises(ValueError):
+        list(run.events(["lookup"], timeout=WAIT))
+
+
+def test_memo_predicate_decides_which_results_are_reused():
+    replies, calls = iter(["Error analyzing skills: 429", "- Python", "unused"]), []
+
+    def analysis(run):
+        calls.append(run.inputs["text"])
+        return next(replies)
+
+    turns = graph(stages.Stage("analysis", analysis, memoize=lambda text: not text.startswith("Error")))
+
+    def result(key):
+        return turns.start({"text": key}, memo_key=key).result("analysis", WAIT)
+
+    assert result("python") == "Error analyzing skills: 429"
+    assert result("python") == "- Python"
+    assert result("python") == "- Python"
+    assert calls == ["python", "python"]
+
+
+def test_memo_needs_a_key_and_is_bounded():
+    calls = []
+    turns = stages.StageGraph([stages.Stage("keyword", lambda run: calls.append(1) or len(calls), memoize=True)], memo_size=1)
+
+    assert turns.start({}).result("keyword", WAIT) == 1
+    assert turns.start({}).result("keyword", WAIT) == 2
+    assert turns.start({}, memo_key="a").result("keyword", WAIT) == 3
+    assert turns.start({}, memo_key="a").result("keyword", WAIT) == 3
+    turns.start({}, memo_key="b").result("keyword", WAIT)
+    # "a" was evicted to keep one entry
+    assert turns.start({}, memo_key="a").result("keyword", WAIT) == 5
+
+
+def test_events_report_partials_then_the_result():
+    def analysis(run):
+        run.publish("analysis", "- Py")
+        return "- Python"
+
+    run = graph(stages.Stage("analysis", analysis)).start({})
+    events = list(run.events(["analysis"], timeout=WAIT))
+    assert events[-1] == ("analysis", "- Python", True)
+    assert all(not done for _, _, done in events[:-1])
+
+
+def test_events_stop_at_the_timeout():
+    release = threading.Event()
+    run = graph(stages.Stage("slow", lambda run: release.wait(WAIT))).start({})
+    try:
+        assert list(run.events(["slow"], timeout=0.05)) == []
+    finally:
+        release.set()
+
+
+def test_unknown_dependencies_and_cycles_are_rejected():
+    with pytest.raises(ValueError):
+        graph(stages.Stage("lookup", lambda run, value: value, ("keyword",)))
+    with pytest.raises(ValueError):
+        graph(
+            stages.Stage("a", lambda run, value: value, ("b",)),
+            stages.Stage("b", lambda run, value: value, ("a",)),
+        )
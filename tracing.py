@@ -0,0 +1,301 @@
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Optional JSON-lines log of finished turn traces, one object per turn
+TRACE_LOG_PATH = os.getenv("TRACE_LOG_PATH", "")
+# Port for a Prometheus-format /metrics endpoint; unset disables it
+METRICS_PORT = os.getenv("METRICS_PORT", "")
+# Show the span waterfall of the latest turn in the sidebar
+PANEL_ENABLED = os.getenv("TRACE_PANEL", "0") == "1"
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float("inf"))
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation: a pipeline stage, a Gemini call or an HTTP request.
+
+    Spans belong to the turn trace that was current when they started (if
+    any) and are always counted in the process-wide metrics when they end.
+    """
+
+    def __init__(self, name, kind, trace, parent, attrs):
+        self.name = name
+        self.kind = kind
+        self.trace = trace
+        self.depth = parent.depth + 1 if parent is not None else 0
+        self.attrs = dict(attrs)
+        self.status = None
+        self.started = time.perf_counter()
+        self.ended = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def end(self, status="ok", error=None):
+        """Finish the span; `error` sets the status to its exception type. Later calls are ignored."""
+        if self.ended is not None:
+            return
+        self.ended = time.perf_counter()
+        self.status = type(error).__name__ if error is not None else str(status)
+        _metrics.observe_span(self)
+        if self.trace is not None:
+            self.trace.add_span(self)
+
+    @property
+    def duration(self):
+        return (self.ended or time.perf_counter()) - self.started
+
+    def to_dict(self, origin):
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "status": self.status,
+            "depth": self.depth,
+            "start_ms": round((self.started - origin) * 1000, 1),
+            "duration_ms": round(self.duration * 1000, 1),
+            **self.attrs,
+        }
+
+
+def start_span(name, kind="stage", **attrs):
+    """Start a span under the current trace and span without making it current.
+
+    Use this when the span ends somewhere else, such as after a streamed
+    reply has been consumed; otherwise prefer `span`.
+    """
+    return Span(name, kind, _current_trace.get(), _current_span.get(), attrs)
+
+
+@contextmanager
+def span(name, kind="stage", **attrs):
+    """Time the enclosed block as a span; spans started inside it become its children."""
+    current = start_span(name, kind, **attrs)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.end(error=e)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+
+
+def traced(name, kind="stage"):
+    """Decorator recording every call of the function as a span."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def submit(executor, fn, *args, **kwargs):
+    """`executor.submit` that runs `fn` in the caller's trace context, so its spans join the turn."""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class TurnTimer:
+    """Trace of one chat turn: time to first token, total time and the spans inside it.
+
+    Creating a timer makes it the current trace, so spans started afterwards
+    in this thread (or in work submitted with `submit`) are rolled up into it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.started = time.perf_counter()
+        self.first_token_at = None
+        self.spans = []
+        self._lock = threading.Lock()
+        _current_trace.set(self)
+
+    def add_span(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def first_token(self):
+        """Mark the moment the first piece of the answer is shown. Later calls are ignored."""
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+
+    def discard(self):
+        """Stop collecting spans for this turn without recording it."""
+        if _current_trace.get() is self:
+            _current_trace.set(None)
+
+    def finish(self):
+        """Stop the timer, log and export the turn and return its metrics in milliseconds."""
+        self.discard()
+        ended = time.perf_counter()
+        first = self.first_token_at if self.first_token_at is not None else ended
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.started)
+        metrics = {
+            "path": self.path,
+            "ttft_ms": round((first - self.started) * 1000, 1),
+            "total_ms": round((ended - self.started) * 1000, 1),
+            "spans": [s.to_dict(self.started) for s in spans],
+        }
+        logger.info(
+            "turn path=%s ttft_ms=%.1f total_ms=%.1f spans=%d",
+            metrics["path"], metrics["ttft_ms"], metrics["total_ms"], len(spans),
+        )
+        _metrics.observe_turn(metrics)
+        _write_trace(metrics)
+        return metrics
+
+
+_trace_log_lock = threading.Lock()
+
+
+def _write_trace(metrics):
+    if not TRACE_LOG_PATH:
+        return
+    record = json.dumps({"ts": round(time.time(), 3), **metrics}, default=str)
+    try:
+        with _trace_log_lock, open(TRACE_LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(record + "\n")
+    except OSError as e:
+        logger.warning("Could not write trace log %s: %s", TRACE_LOG_PATH, e)
+
+
+# ---------------------------------------------------------------------------
+# Process-wide metrics in Prometheus text format
+
+
+class _Histogram:
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+
+
+def _labels(pairs):
+    escaped = (
+        '{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+class Metrics:
+    """Span and turn durations and payload sizes, aggregated since process start."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans = {}
+        self._bytes = {}
+        self._turns = {}
+        self._ttft = {}
+
+    def observe_span(self, span):
+        key = (("kind", span.kind), ("name", span.name), ("status", span.status))
+        with self._lock:
+            self._spans.setdefault(key, _Histogram()).observe(span.duration)
+            for direction in ("request", "response"):
+                size = span.attrs.get(f"{direction}_bytes")
+                if size:
+                    size_key = (("kind", span.kind), ("name", span.name), ("direction", direction))
+                    self._bytes[size_key] = self._bytes.get(size_key, 0) + size
+
+    def observe_turn(self, metrics):
+        key = (("path", metrics["path"]),)
+        with self._lock:
+            self._turns.setdefault(key, _Histogram()).observe(metrics["total_ms"] / 1000)
+            self._ttft.setdefault(key, _Histogram()).observe(metrics["ttft_ms"] / 1000)
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, help_text, series in (
+                ("oracle_span_duration_seconds", "Duration of LLM calls, HTTP requests and pipeline stages.", self._spans),
+                ("oracle_turn_duration_seconds", "Total time of a chat turn.", self._turns),
+                ("oracle_turn_ttft_seconds", "Time to the first visible part of a chat turn's answer.", self._ttft),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for key, histogram in sorted(series.items()):
+                    for bound, count in zip(BUCKETS, histogram.buckets):
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{name}_bucket{_labels(key + (('le', le),))} {count}")
+                    lines.append(f"{name}_sum{_labels(key)} {histogram.sum:.6f}")
+                    lines.append(f"{name}_count{_labels(key)} {histogram.count}")
+            lines += [
+                "# HELP oracle_span_payload_bytes_total Bytes sent and received by LLM calls and HTTP requests.",
+                "# TYPE oracle_span_payload_bytes_total counter",
+            ]
+            for key, total in sorted(self._bytes.items()):
+                lines.append(f"oracle_span_payload_bytes_total{_labels(key)} {total}")
+        return "\n".join(lines) + "\n"
+
+
+_metrics = Metrics()
+
+
+def render_metrics():
+    return _metrics.render()
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=METRICS_PORT):
+    """Serve `render_metrics()` at http://0.0.0.0:<port>/metrics, once per process.
+
+    Does nothing when `port` is unset. Every Streamlit session in the process
+    shares the one endpoint.
+    """
+    global _server
+    if not port or _server is not None:
+        return
+    with _server_lock:
+        if _server is not None:
+            return
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = render_metrics().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        try:
+            _server = ThreadingHTTPServer(("0.0.0.0", int(port)), Handler)
+        except OSError as e:
+            logger.warning("Metrics endpoint not started on port %s: %s", port, e)
+            _server = False
+            return
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        logger.info("Serving metrics on port %s", port)